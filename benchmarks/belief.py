@@ -0,0 +1,44 @@
+"""
+Per turn cost of keeping a BeliefTracker up to date against recomputing beliefs from scratch every turn.
+Run `python -m benchmarks.belief` from the repository root.
+"""
+import random
+import time
+
+from coup.belief import BeliefTracker
+from coup.sim import random_turns, seeded_game
+
+
+def play(n_games: int, seed: int, mode: str) -> tuple[float, int]:
+    """
+    Play random games, querying every seat's beliefs after each turn.
+    :param mode: 'none' to skip beliefs, 'incremental' for an attached tracker, 'scratch' to replay every turn
+    :return: seconds taken and the number of turns
+    """
+    rng = random.Random(seed)
+    turns = 0
+    elapsed = 0.0
+    for _ in range(n_games):
+        game = seeded_game(4, rng)
+        start = time.perf_counter()
+        tracker = BeliefTracker(game, 0) if mode == 'incremental' else None
+        for _ in random_turns(game, rng):
+            turns += 1
+            if mode == 'scratch':
+                tracker = BeliefTracker.from_history(game, 0)
+            if tracker is not None:
+                for seat in range(4):
+                    tracker.probability(seat, 0)
+        elapsed += time.perf_counter() - start
+    return elapsed, turns
+
+
+def main(n_games: int = 300):
+    base, turns = play(n_games, 1, 'none')
+    for mode in ('incremental', 'scratch'):
+        elapsed, _ = play(n_games, 1, mode)
+        print(f'{mode:>12}: {(elapsed - base) / turns * 1e6:8.2f} us per turn over playing alone')
+
+
+if __name__ == '__main__':
+    main()
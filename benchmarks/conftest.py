@@ -0,0 +1,21 @@
+"""
+Benchmarks run with pytest-benchmark, they are kept out of the default test run:
+
+    python -m pytest benchmarks --benchmark-save=baseline
+    python -m pytest benchmarks --benchmark-compare --benchmark-compare-fail=mean:10%
+
+Results are saved as JSON under benchmarks/baselines/<machine>/, comparisons are against the latest saved run on the
+same machine and fail when a benchmark's mean is more than the given percentage slower. Baselines are not committed,
+a baseline has to be saved on each machine before comparing.
+"""
+from pathlib import Path
+
+import pytest
+
+DEFAULT_STORAGE = 'file://./.benchmarks'
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    if getattr(config.option, 'benchmark_storage', None) == DEFAULT_STORAGE:
+        config.option.benchmark_storage = f'file://{Path(__file__).parent / "baselines"}'
@@ -0,0 +1,32 @@
+"""
+Measures CoupEnv steps per second with random legal actions, and the cost of encoding observations alone.
+Run `python -m benchmarks.env` from the repository root.
+"""
+import random
+import time
+import timeit
+
+import numpy as np
+
+from coup.env import CoupEnv
+
+
+def main(steps: int = 50000):
+    for n_players in (2, 4, 6):
+        env = CoupEnv(n_players, seed=1)
+        rng = random.Random(1)
+        env.reset()
+        indices = np.arange(env.n_actions)
+        start = time.perf_counter()
+        for _ in range(steps):
+            action = rng.choice(indices[env.action_mask])
+            _, _, terminated, truncated, _ = env.step(action)
+            if terminated or truncated:
+                env.reset()
+        elapsed = time.perf_counter() - start
+        encode = timeit.timeit(env.encode, number=steps) / steps
+        print(f'{n_players} players: {steps / elapsed:8.0f} steps/sec, encode {encode * 1e6:6.2f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,25 @@
+"""
+Compares Coup.snapshot/restore and Coup.clone against copy.deepcopy.
+Run `python -m benchmarks.snapshot` from the repository root.
+"""
+import copy
+import random
+import timeit
+
+from coup import Coup, Player
+
+
+def main(number: int = 20000):
+    c = Coup([Player(f'p{i}') for i in range(4)], seed=1)
+    c.trigger('income')
+    c.trigger('captain', target='p2')
+    snapshot = c.snapshot()
+    rng = random.Random(2)
+    for name, stmt in [('snapshot', c.snapshot), ('restore', lambda: c.restore(snapshot)), ('clone', c.clone),
+                       ('clone(rng)', lambda: c.clone(rng)), ('deepcopy', lambda: copy.deepcopy(c))]:
+        n = number // 20 if name == 'deepcopy' else number
+        print(f'{name:>10}: {timeit.timeit(stmt, number=n) / n * 1e6:8.2f} us')
+
+
+if __name__ == '__main__':
+    main()
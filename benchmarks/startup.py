@@ -0,0 +1,34 @@
+"""
+Measures how long `import coup` takes in a fresh interpreter, from `python -X importtime`.
+Run `python -m benchmarks.startup` from the repository root.
+"""
+import statistics
+import subprocess
+import sys
+
+
+def import_times(statement: str = 'import coup') -> dict[str, int]:
+    """
+    :return: cumulative import time in microseconds of every module imported by statement in a new interpreter
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], capture_output=True, text=True,
+                            check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and not line.endswith('package'):
+            _, cumulative, name = line[len('import time:'):].split('|')
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def main(runs: int = 20):
+    times = [import_times() for _ in range(runs)]
+    print(f'import coup: {statistics.median(t["coup"] for t in times) / 1000:.1f} ms median of {runs}, '
+          f'{len(times[0])} modules')
+    heavy = sorted(times[0].items(), key=lambda item: -item[1])[:10]
+    for name, cumulative in heavy:
+        print(f'{name:>40} {cumulative / 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
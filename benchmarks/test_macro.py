@@ -0,0 +1,17 @@
+import pytest
+
+from coup.sim import RandomAgent, run_games
+
+pytest.importorskip('pytest_benchmark')
+
+GAMES = 20
+
+
+@pytest.mark.parametrize('n_players', [2, 4, 6])
+def test_random_games(benchmark, n_players):
+    agents = [RandomAgent() for _ in range(n_players)]
+    # The same seed plays the same games every round
+    stats = benchmark(run_games, GAMES, agents, seed=0)
+    assert stats.games == GAMES
+    benchmark.extra_info['games'] = GAMES
+    benchmark.extra_info['mean_length'] = stats.mean_length
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from coup import *
+
+pytest.importorskip('pytest_benchmark')
+
+ROUNDS = 2000
+
+
+def fresh_player() -> Player:
+    return Player('test0', cards=[Card('duke'), Card('captain')])
+
+
+@pytest.mark.parametrize('n_players', [2, 4, 6])
+def test_coup_init(benchmark, n_players):
+    names = [f'p{seat}' for seat in range(n_players)]
+    benchmark(lambda: Coup([Player(name) for name in names], seed=1))
+
+
+def test_deck(benchmark):
+    rng = random.Random(0)
+    benchmark(Deck, rng=rng)
+
+
+def test_player_show(benchmark):
+    card = benchmark.pedantic(Player.show, setup=lambda: ((fresh_player(), 'captain'), {}), rounds=ROUNDS)
+    assert card.name == 'captain'
+
+
+def test_player_lose_influence(benchmark):
+    benchmark.pedantic(Player.lose_influence, setup=lambda: ((fresh_player(),), {}), rounds=ROUNDS)
+
+
+def bench_trigger(benchmark, c: Coup, trigger: str, **kwargs):
+    # Every round starts from the same position
+    snapshot = c.snapshot()
+
+    def setup():
+        c.restore(snapshot)
+        return (trigger,), kwargs
+    assert benchmark.pedantic(c.trigger, setup=setup, rounds=ROUNDS)
+
+
+def test_income(benchmark):
+    bench_trigger(benchmark, Coup([Player('test0'), Player('test1')], seed=0), 'income')
+
+
+def test_challenge_duke(benchmark):
+    c = Coup([Player('test0', cards=[Card('duke'), Card('captain')]), Player('test1')], seed=0)
+    c.trigger('duke')
+    bench_trigger(benchmark, c, 'challenge_duke', challenger='test1')
+
+
+def test_block_foreign_aid(benchmark):
+    c = Coup([Player('test0'), Player('test1')], seed=0)
+    c.trigger('foreign_aid')
+    bench_trigger(benchmark, c, 'block_foreign_aid', blocker='test1')
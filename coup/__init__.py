@@ -2,3 +2,18 @@ __version__ = '0.1.0'
 
 from .game import *
 from .deck import *
+
+# Everything else is imported on first use, so `import coup` only loads the game and plain transitions
+_SUBMODULES = {'agents', 'belief', 'diagram', 'endgame', 'env', 'instrument', 'log', 'server', 'sim', 'tournament',
+               'vec', 'zobrist'}
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        import importlib
+        return importlib.import_module(f'{__name__}.{name}')
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+
+def __dir__():
+    return sorted(set(globals()) | _SUBMODULES)
@@ -0,0 +1,2 @@
+# Search agents live in their own modules, e.g. coup.agents.mcts
+from coup.sim import Agent, AlwaysChallengeAgent, GreedyCoinsAgent, RandomAgent
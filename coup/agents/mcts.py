@@ -0,0 +1,190 @@
+"""
+Information set Monte Carlo tree search.
+Run `python -m coup.agents.mcts -n 20 --iterations 500 random random` to play it against other agents.
+"""
+import argparse
+import math
+import random
+import time
+
+from coup.game import Coup
+from coup.player import Player
+from coup.sim import AGENTS, Action, SimStats, action_kwargs, next_action
+from coup.states import States
+from coup.zobrist import PositionCache, ZobristHash, info_hash
+
+
+def determinize(game: Coup, player: Player, rng: random.Random) -> Coup:
+    """
+    Copy game with every card player can't see dealt again at random.
+    The face down cards of the other players and the deck are shuffled together and redistributed, face up cards
+    and player's own hand stay where they are.
+    :return Coup: a clone of game consistent with what player knows
+    """
+    c = game.clone(rng)
+    hidden = [card for other in c.players if other.name != player.name for card in other.cards if not card.face_up]
+    pool = list(c.deck.codes) + [card.code for card in hidden]
+    rng.shuffle(pool)
+    for card in hidden:
+        card.code = pool.pop()
+    c.deck.codes[:] = bytes(pool)
+    return c
+
+
+def info_key(game: Coup, player: Player) -> int:
+    """
+    :return int: a hash of the public state of game and the hand of the player about to act
+    """
+    return info_hash(game, game.seats[player.name])
+
+
+class Node:
+    __slots__ = ('visits', 'actions')
+
+    def __init__(self):
+        self.visits = 0
+        # action -> [visits, wins]
+        self.actions: dict[Action, list[int]] = {}
+
+
+class _Playout:
+    """
+    Acts for every seat during one iteration: descends the tree while it has statistics, expands one node and
+    plays randomly from there.
+    """
+
+    def __init__(self, agent: 'MCTSAgent', position: ZobristHash):
+        self.agent = agent
+        self.position = position
+        self.path: list[tuple[Node, Action, int]] = []
+        self.in_tree = True
+
+    def act(self, game: Coup, player: Player, options: list[Action], rng: random.Random) -> Action:
+        if not self.in_tree or len(options) == 1:
+            return rng.choice(options)
+        key = self.position.info_key(game.seats[player.name])
+        node = self.agent.lookup(key)
+        if node is None:
+            node = self.agent.insert(key)
+            # The rest of the playout is random, the hash is no longer needed
+            self.in_tree = False
+            self.position.detach()
+            action = rng.choice(options)
+        else:
+            action = self.agent.select(node, options, rng)
+        self.path.append((node, action, game.seats[player.name]))
+        return action
+
+
+class MCTSAgent:
+    """
+    Single observer information set MCTS. Each iteration samples the hidden cards, descends a tree whose nodes are
+    shared through a transposition table keyed on the acting player's information, and finishes the game with
+    random play.
+    """
+
+    def __init__(self, iterations: int | None = 1000, time_limit: float | None = None, exploration: float = 0.7,
+                 max_depth: int = 200, table_size: int = 100_000, table: PositionCache | None = None):
+        """
+        :param iterations: iterations per decision
+        :param time_limit: seconds per decision, the search stops at whichever budget runs out first
+        :param exploration: the UCB1 exploration constant
+        :param max_depth: playouts longer than this many actions count as a loss for every player
+        :param table_size: nodes kept in the transposition table, the least recently used are evicted
+        :param table: a transposition table to share with other agents, table_size is then ignored
+        """
+        if iterations is None and time_limit is None:
+            raise Exception('a search budget is required')
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.exploration = exploration
+        self.max_depth = max_depth
+        self.table_size = table_size
+        self.table = PositionCache(table_size) if table is None else table
+        self.total_iterations = 0
+        self.total_time = 0.0
+
+    def lookup(self, key: int) -> Node | None:
+        return self.table.get(key)
+
+    def insert(self, key: int) -> Node:
+        node = Node()
+        self.table.put(key, node)
+        return node
+
+    def select(self, node: Node, options: list[Action], rng: random.Random) -> Action:
+        untried = [option for option in options if option not in node.actions]
+        if untried:
+            return rng.choice(untried)
+        log_visits = math.log(node.visits)
+        best, best_score = options[0], -1.0
+        for option in options:
+            visits, wins = node.actions[option]
+            score = wins / visits + self.exploration * math.sqrt(log_visits / visits)
+            if score > best_score:
+                best, best_score = option, score
+        return best
+
+    def search(self, game: Coup, player: Player, root: Node, options: list[Action], rng: random.Random):
+        """
+        Run one iteration from the root decision of player in game.
+        """
+        c = determinize(game, player, rng)
+        playout = _Playout(self, ZobristHash(c))
+        action = self.select(root, options, rng)
+        playout.path.append((root, action, c.seats[player.name]))
+        c.trigger(action[0], **action_kwargs(action))
+        agents = [playout] * len(c.players)
+        depth = 1
+        while c.state is not States.game_over and depth < self.max_depth:
+            action = next_action(c, agents, c.seats, rng)
+            c.trigger(action[0], **action_kwargs(action))
+            depth += 1
+        if playout.in_tree:
+            playout.position.detach()
+        winner = c.alive.bit_length() - 1 if c.state is States.game_over else None
+        for node, action, seat in playout.path:
+            node.visits += 1
+            stats = node.actions.setdefault(action, [0, 0])
+            stats[0] += 1
+            stats[1] += seat == winner
+
+    def act(self, game: Coup, player: Player, options: list[Action], rng: random.Random) -> Action:
+        if len(options) == 1:
+            return options[0]
+        key = info_key(game, player)
+        root = self.lookup(key) or self.insert(key)
+        start = time.perf_counter()
+        deadline = None if self.time_limit is None else start + self.time_limit
+        iterations = 0
+        while (self.iterations is None or iterations < self.iterations) and \
+                (deadline is None or time.perf_counter() < deadline):
+            self.search(game, player, root, options, rng)
+            iterations += 1
+        self.total_iterations += iterations
+        self.total_time += time.perf_counter() - start
+        return max(options, key=lambda option: root.actions.get(option, (0, 0))[0])
+
+    @property
+    def iterations_per_sec(self) -> float:
+        return self.total_iterations / self.total_time if self.total_time else 0.0
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description='Play the MCTS agent in seat 0 against other agents')
+    parser.add_argument('opponents', nargs='+', choices=sorted(AGENTS))
+    parser.add_argument('-n', type=int, default=20, help='number of games')
+    parser.add_argument('--iterations', type=int, default=500)
+    parser.add_argument('--time-limit', type=float, default=None)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    from coup.sim import run_games
+    agent = MCTSAgent(args.iterations, args.time_limit)
+    stats: SimStats = run_games(args.n, [agent] + [AGENTS[name]() for name in args.opponents], args.seed)
+    print(stats)
+    print(f'{agent.iterations_per_sec:.0f} iterations/sec, {agent.table}')
+
+
+if __name__ == '__main__':
+    main()
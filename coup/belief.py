@@ -0,0 +1,203 @@
+"""
+Incremental beliefs about the cards a viewer can't see.
+
+A tracker attaches to a game as an observer and updates on every claim, challenge, exchanged card and lost influence,
+instead of agents rebuilding the counts from the players' cards and the history each turn. Each hidden card of a
+player is treated as drawn from the unseen cards, with every card weighted by what the player's claims and
+challenges have shown about it:
+    - claiming a card multiplies its weight by CLAIM_WEIGHT
+    - losing a challenge to a claim shows the player has none of the card, its weight drops to 0
+    - revealing a card, or proving it and exchanging it, starts the player's weights over
+"""
+from typing import Any, Protocol
+
+from coup.deck import CARDS_PER_TYPE, Card, card_codes, card_types
+from coup.game import Coup
+from coup.player import Player
+
+CLAIM_WEIGHT = 2.0
+MAX_WEIGHT = 16.0
+
+# Triggers claiming a card: the claimant (a Coup attribute, or the keyword naming them) and the card
+CLAIMS = {'duke': ('current_player', 'duke'), 'captain': ('current_player', 'captain'),
+          'assassin': ('current_player', 'assassin'), 'ambassador': ('current_player', 'ambassador'),
+          'block_foreign_aid': ('blocker', 'duke'), 'block_assassin': ('assassin_target', 'contessa'),
+          'block_captain': ('captain_target', 'captain')}
+# Challenges: the player challenged and the card they must show, as in Coup.resolve_challenge_*
+CHALLENGES = {'challenge_duke': ('current_player', 'duke'), 'challenge_captain': ('current_player', 'captain'),
+              'challenge_assassin': ('current_player', 'assassin'),
+              'challenge_ambassador': ('current_player', 'ambassador'),
+              'challenge_block_foreign_aid': ('foreign_aid_blocker', 'duke'),
+              'challenge_block_assassin': ('assassin_target', 'contessa'),
+              'challenge_block_captain': ('captain_target', 'captain')}
+
+
+class Observer(Protocol):
+    """
+    Receives a game's events once appended to Coup.observers.
+    """
+
+    def before_trigger(self, game: Coup, trigger_name: str, kwargs: dict[str, Any]): ...
+
+    def after_trigger(self, game: Coup, trigger_name: str, kwargs: dict[str, Any], result: bool): ...
+
+    def on_lose_influence(self, game: Coup, player: Player, card: Card | None): ...
+
+    def on_exchange(self, game: Coup, player: Player, card: Card): ...
+
+
+class BeliefTracker:
+    """
+    Beliefs about every seat's face down cards from one seat's view, or from the public view. Counts and weights are
+    kept in flat lists sized when the tracker is made, every query is O(1).
+    """
+
+    def __init__(self, game: Coup, viewer: int | None = None):
+        """
+        Attach to game, the game must not have been restored or replaced since.
+        :param viewer: the seat whose cards are known, None for what every player can see
+        """
+        self.game = game
+        self.viewer = viewer
+        n = len(card_types)
+        self.unseen = [CARDS_PER_TYPE] * n
+        self.hidden = [0] * len(game.players)
+        self.own = [0] * n
+        self.weights = [1.0] * (len(game.players) * n)
+        self.norms = [0.0] * len(game.players)
+        for seat, player in enumerate(game.players):
+            for card in player.cards:
+                if card.face_up:
+                    self.unseen[card.code] -= 1
+                else:
+                    self.hidden[seat] += 1
+                    if seat == viewer:
+                        self.own[card.code] += 1
+                        self.unseen[card.code] -= 1
+        for seat in range(len(game.players)):
+            self.norms[seat] = float(sum(self.unseen))
+        # The claim or challenge of the trigger being run, and whether the challenged player showed the card
+        self._pending: tuple[str, int, int] | None = None
+        self._shown = False
+        game.observers.append(self)
+
+    def detach(self):
+        self.game.observers.remove(self)
+
+    @classmethod
+    def from_history(cls, game: Coup, viewer: int | None = None) -> 'BeliefTracker':
+        """
+        Recompute beliefs from scratch by replaying game from its seed and starting position.
+        :return BeliefTracker: a tracker attached to the replayed game
+        """
+        if game.seed is None:
+            raise Exception('only games with a seed can be replayed')
+        players = [Player(name, cards=[Card.from_code(code, face_up) for code, face_up in cards], coins=coins)
+                   for name, coins, cards in game.setup]
+        c = type(game)(players, seed=game.seed)
+        tracker = cls(c, viewer)
+        for trigger_name, kwargs, _ in game.history:
+            c.trigger(trigger_name, **kwargs)
+        return tracker
+
+    # Queries
+
+    def probability(self, seat: int, code: int) -> float:
+        """
+        :return: the probability that any one of seat's face down cards is code
+        """
+        if seat == self.viewer:
+            return self.own[code] / self.hidden[seat] if self.hidden[seat] else 0.0
+        norm = self.norms[seat]
+        return self.unseen[code] * self.weights[seat * len(card_types) + code] / norm if norm else 0.0
+
+    def expected(self, seat: int, code: int) -> float:
+        """
+        :return: the expected number of code among seat's face down cards
+        """
+        return self.hidden[seat] * self.probability(seat, code)
+
+    def holds(self, seat: int, code: int) -> float:
+        """
+        :return: the probability that seat has code face down
+        """
+        return 1 - (1 - self.probability(seat, code)) ** self.hidden[seat]
+
+    # Updates
+
+    def _set_weight(self, seat: int, code: int, weight: float):
+        i = seat * len(card_types) + code
+        self.norms[seat] += self.unseen[code] * (weight - self.weights[i])
+        self.weights[i] = weight
+
+    def _add_unseen(self, code: int, count: int):
+        self.unseen[code] += count
+        n = len(card_types)
+        weights = self.weights
+        norms = self.norms
+        for seat in range(len(norms)):
+            norms[seat] += count * weights[seat * n + code]
+
+    def _reset(self, seat: int):
+        for code in range(len(card_types)):
+            self._set_weight(seat, code, 1.0)
+
+    def before_trigger(self, game: Coup, trigger_name: str, kwargs: dict[str, Any]):
+        self._pending = None
+        if trigger_name in CLAIMS:
+            claimant, card = CLAIMS[trigger_name]
+            player = game.get_player(kwargs.get('blocker')) if claimant == 'blocker' else getattr(game, claimant)
+        elif trigger_name in CHALLENGES:
+            claimant, card = CHALLENGES[trigger_name]
+            player = getattr(game, claimant)
+            self._shown = False
+        else:
+            return
+        if player is not None:
+            self._pending = trigger_name, game.seats[player.name], card_codes[card]
+
+    def after_trigger(self, game: Coup, trigger_name: str, kwargs: dict[str, Any], result: bool):
+        pending = self._pending
+        self._pending = None
+        if pending is None or not result:
+            return
+        trigger_name, seat, code = pending
+        if seat == self.viewer:
+            return
+        if trigger_name in CLAIMS:
+            self._set_weight(seat, code, min(self.weights[seat * len(card_types) + code] * CLAIM_WEIGHT, MAX_WEIGHT))
+        elif not self._shown:
+            self._set_weight(seat, code, 0.0)
+
+    def on_lose_influence(self, game: Coup, player: Player, card: Card | None):
+        if card is None:
+            return
+        seat = game.seats[player.name]
+        self.hidden[seat] -= 1
+        if seat == self.viewer:
+            self.own[card.code] -= 1
+        else:
+            self._add_unseen(card.code, -1)
+            self._set_weight(seat, card.code, 1.0)
+
+    def on_exchange(self, game: Coup, player: Player, card: Card):
+        seat = game.seats[player.name]
+        pending = self._pending
+        if pending is not None and pending[1] == seat:
+            self._shown = True
+        # Player.show also takes a face up card, the player then gains a face down card
+        revealed = player.influence() > self.hidden[seat]
+        if revealed:
+            self.hidden[seat] += 1
+        if seat == self.viewer:
+            # The viewer sees the card they drew
+            drawn = player.cards[-1].code
+            if not revealed:
+                self.own[card.code] -= 1
+            self._add_unseen(card.code, 1)
+            self.own[drawn] += 1
+            self._add_unseen(drawn, -1)
+        else:
+            if revealed:
+                self._add_unseen(card.code, 1)
+            self._reset(seat)
@@ -1,41 +1,78 @@
 import random
 
 card_types = ['duke', 'assassin', 'contessa', 'captain', 'ambassador']
+# Cards are stored as their index in card_types
+card_codes = {name: code for code, name in enumerate(card_types)}
+CARDS_PER_TYPE = 3
 
 
 class Card:
+    __slots__ = ('code', 'face_up')
+
     def __init__(self, name, face_up=False):
-        if name not in card_types:
+        if name not in card_codes:
             raise Exception('undefined card type')
-        self.name = name
+        self.code = card_codes[name]
         self.face_up = face_up
 
+    @classmethod
+    def from_code(cls, code: int, face_up=False) -> 'Card':
+        card = cls.__new__(cls)
+        card.code = code
+        card.face_up = face_up
+        return card
+
+    @property
+    def name(self) -> str:
+        return card_types[self.code]
+
     def __repr__(self):
         return f'{self.name}, {"UP" if self.face_up else "DOWN"}'
 
     def __eq__(self, other):
-        return isinstance(other, Card) and other.name == self.name
+        return isinstance(other, Card) and other.code == self.code
 
 
 class Deck:
+    __slots__ = ('rng', 'codes')
 
-    def __init__(self, pre_cards: list[Card] | None = None):
+    def __init__(self, pre_cards: list[Card] | None = None, rng: random.Random | None = None):
         """ Returns a shuffled deck
         :parameter pre_cards a list of pre drawn cards for debugging purposes. These cards are considered already drawn
-        and will not be added to the deck."""
-        self.cards: list[Card] = []
-        for card_type in card_types:
-            while self.cards.count(Card(card_type)) + (pre_cards.count((Card(card_type))) if pre_cards else 0) < 3:
-                self.cards.append(Card(card_type))
+        and will not be added to the deck.
+        :parameter rng the random source for shuffling, defaults to a new unseeded one"""
+        self.rng = rng or random.Random()
+        counts = [CARDS_PER_TYPE] * len(card_types)
+        for card in pre_cards or ():
+            counts[card.code] -= 1
+        self.codes = bytearray()
+        for code, count in enumerate(counts):
+            self.codes.extend(bytes([code]) * max(count, 0))
         self.shuffle()
 
+    @property
+    def cards(self) -> list[Card]:
+        """
+        :return: a copy of the deck as cards, the top of the deck is last
+        """
+        return [Card.from_code(code) for code in self.codes]
+
+    def __len__(self):
+        return len(self.codes)
+
     def return_to_deck(self, card):
+        """
+        Put a card back at a uniformly random position.
+        The rest of the deck is already in random order, so this is equivalent to reshuffling the whole deck.
+        """
         card.face_up = False
-        self.cards.append(card)
-        self.shuffle()
+        codes = self.codes
+        codes.append(card.code)
+        i = int(self.rng.random() * len(codes))
+        codes[i], codes[-1] = codes[-1], codes[i]
 
     def draw(self):
-        return self.cards.pop()
+        return Card.from_code(self.codes.pop())
 
     def shuffle(self):
-        random.shuffle(self.cards)
+        self.rng.shuffle(self.codes)
@@ -0,0 +1,76 @@
+"""
+Renders the Coup state machine with graphviz.
+Run `python -m coup.diagram [path] [--format png]` to export the diagram.
+"""
+import argparse
+import hashlib
+import os
+from functools import cache
+
+from coup.game import TRANSITIONS, build_machine
+from coup.states import States
+
+
+def topology_key() -> str:
+    """
+    :return str: a digest of the states and transitions, it changes whenever the topology does
+    """
+    topology = repr([state.value for state in States]) + repr(TRANSITIONS)
+    return hashlib.sha1(topology.encode()).hexdigest()
+
+
+@cache
+def render(key: str, fmt: str = 'png', prog: str = 'dot') -> bytes:
+    """
+    Render the topology, results are cached per process.
+    :param key: the topology key the render is cached under
+    :param fmt: output format understood by graphviz
+    :param prog: graphviz layout program
+    :return bytes: the rendered diagram
+    """
+    # The diagrams extra is only needed here, games never import it
+    from transitions.extensions import GraphMachine
+    m = build_machine(GraphMachine, show_state_attributes=True, show_conditions=True, show_auto_transitions=True)
+    return m.get_graph().draw(None, format=fmt, prog=prog)
+
+
+def export_diagram(path: str = 'coup.png', fmt: str | None = None, prog: str = 'dot') -> str:
+    """
+    Write the state machine diagram to a file.
+    The file is only rendered and written if it was not already exported from the current topology.
+    :param path: file to write
+    :param fmt: output format, defaults to the file extension
+    :param prog: graphviz layout program
+    :return str: the path written
+    """
+    fmt = fmt or os.path.splitext(path)[1].lstrip('.') or 'png'
+    key = f'{topology_key()}:{fmt}:{prog}'
+    key_path = path + '.key'
+    if os.path.exists(path) and os.path.exists(key_path):
+        with open(key_path) as f:
+            if f.read() == key:
+                return path
+
+    data = render(topology_key(), fmt, prog)
+    # Write atomically so workers sharing a directory never see a partial file
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+    with open(tmp, 'w') as f:
+        f.write(key)
+    os.replace(tmp, key_path)
+    return path
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description='Export the Coup state machine diagram')
+    parser.add_argument('path', nargs='?', default='coup.png')
+    parser.add_argument('--format', dest='fmt', default=None)
+    parser.add_argument('--prog', default='dot')
+    args = parser.parse_args(argv)
+    print(export_diagram(args.path, args.fmt, args.prog))
+
+
+if __name__ == '__main__':
+    main()
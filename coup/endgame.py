@@ -0,0 +1,374 @@
+"""
+A tablebase of two player endgames.
+
+Duels are solved under honest play: a player only claims or blocks with a card they hold face down and claims are
+never challenged. Challenging an honest claim only costs the challenger a card, so no card is ever exchanged, the
+deck and the face up cards never matter and the game has no chance left in it. A position is then the coins and the
+face down cards, in order, of the player to move and of their opponent. Cards are lost first to last, as in
+Player.lose_influence.
+
+Positions are solved by retrograde analysis. Influence only goes down, so positions are solved in layers by the
+number of face down cards left, and within a layer each pair of hands is an independent graph of coin counts that is
+solved in a worker process. The table keeps one byte per position and is memory mapped when loaded.
+
+Run `python -m coup.endgame build endgame.bin` to build the table.
+"""
+import argparse
+import heapq
+import mmap
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import product
+
+from coup.deck import CARDS_PER_TYPE, card_codes, card_types
+from coup.game import Coup
+from coup.states import States
+
+MAGIC = b'COUPTB\x01\x00'
+# The current player must coup from 10 coins, so nobody ever holds more than 9 + 3
+MAX_COINS = 12
+COINS = MAX_COINS + 1
+# Ordered face down cards, the first one is lost first
+HANDS: list[tuple[int, ...]] = [(code,) for code in range(len(card_types))] + \
+                               list(product(range(len(card_types)), repeat=2))
+HAND_INDEX = {hand: i for i, hand in enumerate(HANDS)}
+SIZE = COINS * COINS * len(HANDS) * len(HANDS)
+
+WIN = 1
+DRAW = 0
+LOSS = -1
+MAX_PLIES = 127
+
+DUKE = card_codes['duke']
+ASSASSIN = card_codes['assassin']
+CONTESSA = card_codes['contessa']
+CAPTAIN = card_codes['captain']
+AMBASSADOR = card_codes['ambassador']
+
+
+def index(coins: int, opponent_coins: int, hand: int, opponent_hand: int) -> int:
+    """
+    :param hand: index into HANDS of the face down cards of the player to move
+    :return: the position's offset in the table
+    """
+    return ((coins * COINS + opponent_coins) * len(HANDS) + hand) * len(HANDS) + opponent_hand
+
+
+def encode(outcome: int, plies: int) -> int:
+    # 0 is a draw, 1 to 127 a win and 128 to 255 a loss, in that many plies
+    plies = min(plies, MAX_PLIES)
+    return 0 if outcome == DRAW else plies if outcome == WIN else 128 + plies
+
+
+def decode(value: int) -> tuple[int, int]:
+    """
+    :return: the outcome for the player to move and the number of plies to it, 0 for draws
+    """
+    if value == 0:
+        return DRAW, 0
+    return (WIN, value) if value < 128 else (LOSS, value - 128)
+
+
+def lose(hand: int) -> int | None:
+    """
+    :return: the hand after losing its first card, None if that was the last one
+    """
+    cards = HANDS[hand]
+    return HAND_INDEX[cards[1:]] if len(cards) > 1 else None
+
+
+def successors(node: tuple) -> list[tuple]:
+    """
+    The moves from a node of a hand pair's graph.
+    Main nodes are ('turn', coins, opponent coins, hand, opponent hand) with the player to move choosing. Response
+    nodes are (action, coins, opponent coins, hand, opponent hand) with the opponent choosing whether to block.
+    :return: ('node', node, flip) edges within the graph and ('table', index, flip) or ('end', outcome) edges out of
+    it, flip is set when the successor's outcome is for the other player
+    """
+    kind, m, o, h, g = node
+    edges = []
+    if kind != 'turn':
+        # The opponent (g) responds, successors are their turns so no flip
+        block = ('node', ('turn', o, m, g, h), False)
+        if kind == 'foreign_aid':
+            return [block, ('node', ('turn', o, m + 2, g, h), False)]
+        if kind == 'captain':
+            steal = min(2, o)
+            return [block, ('node', ('turn', o - steal, m + steal, g, h), False)]
+        g2 = lose(g)
+        if g2 is None:
+            return [block, ('end', LOSS)]
+        return [block, ('table', index(o, m, g2, h), False)]
+
+    def after(m2: int, o2: int, g2: int | None):
+        # The turn passes to the opponent, a lost card leaves the graph for an already solved layer
+        if g2 is None:
+            edges.append(('end', WIN))
+        elif g2 == g:
+            edges.append(('node', ('turn', o2, m2, g2, h), True))
+        else:
+            edges.append(('table', index(o2, m2, g2, h), True))
+
+    cards = HANDS[h]
+    opponent = HANDS[g]
+    if m >= 10:
+        after(m - 7, o, lose(g))
+        return edges
+    after(m + 1, o, g)
+    if m >= 7:
+        after(m - 7, o, lose(g))
+    if DUKE in opponent:
+        edges.append(('node', ('foreign_aid', m, o, h, g), True))
+    else:
+        after(m + 2, o, g)
+    if DUKE in cards:
+        after(m + 3, o, g)
+    if CAPTAIN in cards:
+        if CAPTAIN in opponent:
+            edges.append(('node', ('captain', m, o, h, g), True))
+        else:
+            steal = min(2, o)
+            after(m + steal, o - steal, g)
+    if ASSASSIN in cards and m >= 3:
+        # Assassinating costs nothing in Coup.do_assassin
+        if CONTESSA in opponent:
+            edges.append(('node', ('assassin', m, o, h, g), True))
+        else:
+            after(m, o, lose(g))
+    if AMBASSADOR in cards:
+        # The trade doesn't change the hand, the turn just passes
+        after(m, o, g)
+    return edges
+
+
+def solve_pair(pair: tuple[int, int], table: bytes) -> list[tuple[int, int]]:
+    """
+    Solve every position with these two hands by retrograde analysis.
+    :param table: the table with every position of fewer cards solved
+    :return: (index, value) of every turn position in the pair
+    """
+    h, g = pair
+    nodes = [('turn', m, o, a, b) for a, b in dict.fromkeys([(h, g), (g, h)])
+             for m in range(COINS) for o in range(COINS)]
+    seen = set(nodes)
+    edges = {}
+    preds: dict[tuple, list[tuple[tuple, bool]]] = {}
+    i = 0
+    while i < len(nodes):
+        node = nodes[i]
+        i += 1
+        edges[node] = node_edges = successors(node)
+        for edge in node_edges:
+            if edge[0] == 'node':
+                if edge[1] not in seen:
+                    seen.add(edge[1])
+                    nodes.append(edge[1])
+                preds.setdefault(edge[1], []).append((node, edge[2]))
+
+    # Every node resolves at most once, in order of plies, so wins are as fast and losses as slow as possible
+    open_ = {}
+    longest = {}
+    # Nodes with a move out of the graph that wins or draws can't lose
+    saved = set()
+    heap = []
+    for node in nodes:
+        open_[node] = 0
+        longest[node] = 0
+        for edge in edges[node]:
+            if edge[0] == 'node':
+                open_[node] += 1
+                continue
+            if edge[0] == 'end':
+                outcome, plies = edge[1], 0
+            else:
+                outcome, plies = decode(table[edge[1]])
+                if edge[2]:
+                    outcome = -outcome
+            if outcome == WIN:
+                heapq.heappush(heap, (plies + 1, WIN, node))
+                saved.add(node)
+            elif outcome == LOSS:
+                longest[node] = max(longest[node], plies)
+            else:
+                saved.add(node)
+        if not open_[node] and node not in saved:
+            heapq.heappush(heap, (longest[node] + 1, LOSS, node))
+
+    solved: dict[tuple, tuple[int, int]] = {}
+    while heap:
+        plies, outcome, node = heapq.heappop(heap)
+        if node in solved:
+            continue
+        solved[node] = outcome, plies
+        for pred, flip in preds.get(node, ()):
+            if pred in solved:
+                continue
+            if (outcome == WIN) != flip:
+                heapq.heappush(heap, (plies + 1, WIN, pred))
+            else:
+                open_[pred] -= 1
+                longest[pred] = max(longest[pred], plies)
+                if not open_[pred] and pred not in saved:
+                    heapq.heappush(heap, (longest[pred] + 1, LOSS, pred))
+    values = []
+    for node in nodes:
+        kind, m, o, a, b = node
+        if kind == 'turn':
+            # Nodes that never resolved can be played forever
+            values.append((index(m, o, a, b), encode(*solved.get(node, (DRAW, 0)))))
+    return values
+
+
+def build(workers: int | None = None) -> bytearray:
+    """
+    Solve every position.
+    :param workers: number of worker processes, defaults to the number of cores. 0 solves in this process.
+    :return: the table, indexed by index()
+    """
+    table = bytearray(SIZE)
+    layers: dict[int, list[tuple[int, int]]] = {}
+    for h in range(len(HANDS)):
+        for g in range(h, len(HANDS)):
+            layers.setdefault(len(HANDS[h]) + len(HANDS[g]), []).append((h, g))
+    pool = ProcessPoolExecutor(workers or os.cpu_count() or 1) if workers != 0 else None
+    try:
+        for cards in sorted(layers):
+            solve = partial(solve_pair, table=bytes(table))
+            pairs = layers[cards]
+            results = pool.map(solve, pairs, chunksize=max(1, len(pairs) // 64)) if pool else map(solve, pairs)
+            for values in results:
+                for i, value in values:
+                    table[i] = value
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return table
+
+
+def save(table: bytes, path: str):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        f.write(table)
+    os.replace(tmp, path)
+
+
+class Tablebase:
+    """
+    A built table, read through a memory map.
+    """
+
+    def __init__(self, path: str):
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(MAGIC)] != MAGIC or len(self.data) != len(MAGIC) + SIZE:
+            raise Exception(f'{path} is not an endgame table')
+
+    def probe(self, coins: int, opponent_coins: int, hand: tuple[int, ...],
+              opponent_hand: tuple[int, ...]) -> tuple[int, int] | None:
+        """
+        :param hand: card codes of the face down cards of the player to move, in order
+        :return: the outcome for the player to move and plies to it, None if the position is outside the table
+        """
+        if not (0 <= coins <= MAX_COINS and 0 <= opponent_coins <= MAX_COINS) or \
+                hand not in HAND_INDEX or opponent_hand not in HAND_INDEX:
+            return None
+        return decode(self.data[len(MAGIC) + index(coins, opponent_coins, HAND_INDEX[hand],
+                                                   HAND_INDEX[opponent_hand])])
+
+    @staticmethod
+    def duel(game: Coup):
+        """
+        :return: the player to move and their opponent if game is a duel on a player's turn, otherwise None
+        """
+        if game.state is not States.player_turn or game.alive.bit_count() != 2:
+            return None
+        player = game.current_player
+        opponent = next(p for seat, p in enumerate(game.players) if game.alive >> seat & 1 and p is not player)
+        return player, opponent
+
+    def solve(self, game: Coup) -> tuple[int, int] | None:
+        """
+        Look up a duel with every card known. The value is for both players following the table's honest play, agents
+        that bluff, challenge or play badly can reach another result.
+        :return: the outcome for the current player and plies to it, None if game is not a duel in the table
+        """
+        duel = self.duel(game)
+        if duel is None:
+            return None
+        player, opponent = duel
+        return self.probe(player.coins, opponent.coins, hidden(player), hidden(opponent))
+
+    def expected_score(self, game: Coup) -> float | None:
+        """
+        The current player's expected score (1 for a win, 0.5 for a draw) over every deal of the face down cards
+        consistent with the public position: the coins, the number of face down cards and the face up cards.
+        :return: None if game is not a duel in the table
+        """
+        duel = self.duel(game)
+        if duel is None:
+            return None
+        player, opponent = duel
+        unseen = [CARDS_PER_TYPE] * len(card_types)
+        for p in game.players:
+            for card in p.cards:
+                if card.face_up:
+                    unseen[card.code] -= 1
+        n, k = len(hidden(player)), len(hidden(opponent))
+        total = weight = 0.0
+        # Ordered deals drawn without replacement from the unseen cards
+        for cards in product(range(len(card_types)), repeat=n + k):
+            left = unseen.copy()
+            p = 1.0
+            remaining = sum(left)
+            for code in cards:
+                p *= left[code] / remaining
+                left[code] -= 1
+                remaining -= 1
+            if not p:
+                continue
+            result = self.probe(player.coins, opponent.coins, cards[:n], cards[n:])
+            if result is None:
+                return None
+            total += p * (result[0] + 1) / 2
+            weight += p
+        return total / weight
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def hidden(player) -> tuple[int, ...]:
+    return tuple(card.code for card in player.cards if not card.face_up)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description='Build or summarise the two player endgame table')
+    parser.add_argument('command', choices=['build', 'stats'])
+    parser.add_argument('path')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+    if args.command == 'build':
+        start = time.perf_counter()
+        save(build(args.workers), args.path)
+        print(f'built {SIZE} positions in {time.perf_counter() - start:.1f}s')
+    else:
+        with Tablebase(args.path) as tb:
+            counts = {WIN: 0, DRAW: 0, LOSS: 0}
+            for value in tb.data[len(MAGIC):]:
+                counts[decode(value)[0]] += 1
+            print(', '.join(f'{name}: {counts[outcome]}' for name, outcome in
+                            (('wins', WIN), ('draws', DRAW), ('losses', LOSS))))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""
+A multi-agent environment for training agents, in the style of Gym: agents take turns acting through reset and step.
+Observations and action masks are written into NumPy buffers allocated once, step returns the same arrays each time.
+"""
+import random
+
+import numpy as np
+
+from coup.deck import CARDS_PER_TYPE, card_types
+from coup.game import Coup, action_kwargs
+from coup.player import Player
+from coup.sim import MAX_ACTIONS, RESPONSES, response_options
+from coup.states import States
+from coup.vec import STATE_CODES, STATES, action_space
+
+DECK_SIZE = len(card_types) * CARDS_PER_TYPE
+
+
+def observation_size(n_players: int) -> int:
+    """
+    :return: the length of one agent's observation, the layout of VecCoup.observe followed by the agent's seat
+    """
+    return len(STATES) + 7 * n_players + len(card_types) * n_players + len(card_types) + 1
+
+
+class CoupEnv:
+    """
+    One game between n_players agents. agent_selection is the seat to act next, in response states every other
+    player is asked in turn order and passing is the decline action, as in coup.sim.
+    observations (n_players, observation_size) float32, row i is seat i's view
+    action_mask (n_actions,) bool, the actions agent_selection may take
+    rewards (n_players,) float32, 1 for the winner and -1 for everybody else once the game is over
+    """
+
+    def __init__(self, n_players: int = 2, seed: int | None = None, max_actions: int = MAX_ACTIONS):
+        if not 2 <= n_players <= 6:
+            raise Exception('games need 2 to 6 players')
+        self.n_players = n_players
+        self.rng = random.Random(seed)
+        self.max_actions = max_actions
+        self.actions = action_space(n_players)
+        self.n_actions = len(self.actions)
+        self.names = [f'p{seat}' for seat in range(n_players)]
+        # (trigger, player name) as in Coup.legal_actions to action index
+        self.action_index = {(trigger, None if seat is None else self.names[seat]): i
+                             for i, (trigger, seat) in enumerate(self.actions)}
+
+        self.observations = np.zeros((n_players, observation_size(n_players)), dtype=np.float32)
+        self.action_mask = np.zeros(self.n_actions, dtype=bool)
+        self.rewards = np.zeros(n_players, dtype=np.float32)
+        self.info: dict = {'agent': None, 'action_mask': self.action_mask}
+        # Offsets of each feature in a row
+        p = n_players
+        self._current = len(STATES)
+        self._targets = self._current + p
+        self._coins = self._targets + 3 * p
+        self._alive = self._coins + p
+        self._face_up = self._alive + p
+        self._down = self._face_up + len(card_types) * p
+        self._deck = self._down + len(card_types)
+        self._seat = self._deck + 1
+        # Views made once so encoding doesn't create any
+        self._row = self.observations[0]
+        self._public = self.observations[0, :self._down]
+        self._public_rest = self.observations[1:, :self._down]
+        self._deck_column = self.observations[:, self._deck]
+
+        self.game: Coup | None = None
+        self.agent_selection: int | None = None
+        self.steps = 0
+        self._responder = 0
+
+    def reset(self, seed: int | None = None) -> tuple[np.ndarray, dict]:
+        """
+        Start a new game.
+        :param seed: reseeds the environment
+        :return: the observations and info, info['agent'] is the seat to act
+        """
+        if seed is not None:
+            self.rng.seed(seed)
+        self.game = Coup([Player(name) for name in self.names], seed=self.rng.getrandbits(64))
+        self.steps = 0
+        self._responder = 0
+        self.rewards.fill(0)
+        self._select()
+        self.encode()
+        return self.observations, self.info
+
+    def step(self, action: int) -> tuple[np.ndarray, np.ndarray, bool, bool, dict]:
+        """
+        Take an action for agent_selection.
+        :param action: an index into actions allowed by action_mask
+        :return: observations, rewards, terminated, truncated and info
+        """
+        game = self.game
+        if self.agent_selection is None:
+            raise Exception('the game is over, call reset')
+        if not self.action_mask[action]:
+            raise Exception(f'illegal action {self.actions[action]}')
+        trigger, seat = self.actions[action]
+        state = game.state
+        if state in RESPONSES and trigger == RESPONSES[state][2]:
+            # Passing, the next responder is asked and the decline is only taken once everybody has passed
+            self._responder += 1
+        else:
+            game.trigger(trigger, **action_kwargs((trigger, None if seat is None else self.names[seat])))
+            self._responder = 0
+            self.steps += 1
+        self._select()
+        while self.agent_selection is None and game.state in RESPONSES:
+            game.trigger(RESPONSES[game.state][2])
+            self._responder = 0
+            self.steps += 1
+            self._select()
+
+        terminated = game.state is States.game_over
+        truncated = not terminated and self.steps >= self.max_actions
+        self.rewards.fill(0)
+        if terminated:
+            self.rewards.fill(-1)
+            self.rewards[game.alive.bit_length() - 1] = 1
+        if terminated or truncated:
+            self.agent_selection = None
+            self.action_mask.fill(False)
+        self.info['agent'] = self.agent_selection
+        self.encode()
+        return self.observations, self.rewards, terminated, truncated, self.info
+
+    def _select(self):
+        """
+        Find the seat to act and fill the action mask. In a response state where everybody has passed
+        agent_selection is None and the state is left as it is.
+        """
+        game = self.game
+        mask = self.action_mask
+        mask.fill(False)
+        state = game.state
+        self.agent_selection = None
+        if state is States.game_over:
+            pass
+        elif state not in RESPONSES:
+            for action in game.legal_actions():
+                mask[self.action_index[action]] = True
+            self.agent_selection = game.player_index
+        else:
+            claimant = getattr(game, RESPONSES[state][0])
+            players = game.players
+            asked = 0
+            for i in range(len(players)):
+                seat = (game.player_index + i) % len(players)
+                player = players[seat]
+                if not game.alive >> seat & 1 or player is claimant:
+                    continue
+                options = response_options(game, player)
+                if not options:
+                    continue
+                if asked == self._responder:
+                    for action in options:
+                        mask[self.action_index[action]] = True
+                    mask[self.action_index[RESPONSES[state][2], None]] = True
+                    self.agent_selection = seat
+                    break
+                asked += 1
+        self.info['agent'] = self.agent_selection
+
+    def encode(self):
+        """
+        Write every seat's observation into observations without allocating.
+        """
+        game = self.game
+        obs = self.observations
+        row = self._row
+        p = self.n_players
+        obs.fill(0)
+        row[STATE_CODES[game.state]] = 1
+        row[self._current + game.player_index] = 1
+        seats = game.seats
+        for i, target in enumerate((game.assassin_target, game.captain_target, game.foreign_aid_blocker)):
+            if target is not None:
+                row[self._targets + i * p + seats[target.name]] = 1
+        alive = game.alive
+        for seat, player in enumerate(game.players):
+            row[self._coins + seat] = player.coins / 12
+            row[self._alive + seat] = alive >> seat & 1
+            for card in player.cards:
+                if card.face_up:
+                    row[self._face_up + card.code * p + seat] += 1
+        np.copyto(self._public_rest, self._public)
+        self._deck_column.fill(len(game.deck.codes) / DECK_SIZE)
+        for seat, player in enumerate(game.players):
+            for card in player.cards:
+                if not card.face_up:
+                    obs[seat, self._down + card.code] += 1
+            obs[seat, self._seat + seat] = 1
@@ -1,16 +1,37 @@
-from typing import Optional, Callable, Any
+import random
+from functools import cache, partial
+from typing import Optional, Any
 
-from transitions import State, EventData
-from transitions.extensions import GraphMachine
+from transitions import Machine, State, EventData
 
 from coup.deck import Card, Deck
 from coup.player import Player
 from coup.states import *
 
+# An action is a trigger and the name of the player it is parameterized with, if any
+Action = tuple[str, str | None]
+
 
 class Coup:
-    def __init__(self, players: list[Player], debug=False):
+    __slots__ = ('debug', 'seed', 'rng', 'history', 'setup', 'foreign_aid_blocker', 'assassin_target', 'captain_target',
+                 'ambassador_cards', 'player_index', 'players', 'alive', 'seats', '_next', '_prev', 'current_player', 'deck',
+                 'm', 'state', '_legal', 'observers')
+
+    def __init__(self, players: list[Player], debug=False, seed: int | None = None, rng: random.Random | None = None):
+        """
+        :param players: the players in turn order
+        :param seed: seeds the game's random source, a game is replayed from its seed and history
+        :param rng: the game's random source, takes precedence over seed
+        """
         self.debug = debug
+        if rng is None:
+            # Draw a seed even when none is given so that every game can be replayed
+            seed = seed if seed is not None else random.getrandbits(64)
+            rng = random.Random(seed)
+        self.seed = seed
+        self.rng = rng
+        # (trigger, kwargs, resulting state) of every transition triggered on the game
+        self.history: list[tuple[str, dict[str, Any], States]] = []
         if self.debug:
             import logging
             logging.basicConfig(level=logging.DEBUG)
@@ -22,101 +43,218 @@ class Coup:
         self.assassin_target: Optional[Player] = None
         self.captain_target: Optional[Player] = None
         self.ambassador_cards: Optional[list[Card]] = None
+        # Players keep their seat for the whole game, eliminated seats are cleared from the alive bitmask and
+        # unlinked from the circular turn order
         self.player_index = 0
         self.players = players
-        self.active_players = players.copy()
-        self.current_player = self.active_players[0]
-
+        self.alive = (1 << len(players)) - 1
+        self.seats: dict[str, int] = {}
+        for seat, player in enumerate(players):
+            self.seats.setdefault(player.name, seat)
+        self._next = [(seat + 1) % len(players) for seat in range(len(players))]
+        self._prev = [(seat - 1) % len(players) for seat in range(len(players))]
+        self.current_player = players[0]
+
+        # The starting position of each player before cards are dealt, a game is replayed from it
+        self.setup = tuple((player.name, player.coins, tuple((card.code, card.face_up) for card in player.cards))
+                           for player in players)
         pre_cards = []
-        for player in self.active_players:
+        for player in self.players:
             pre_cards.extend(player.cards)
-        self.deck = Deck(pre_cards=pre_cards)
+        self.deck = Deck(pre_cards=pre_cards, rng=self.rng)
 
-        for player in self.active_players:
+        for player in self.players:
             while len(player.cards) < 2:
                 player.draw(self.deck.draw())
 
-        self.m: GraphMachine = GraphMachine(model=self, states=States, initial=States.player_turn, send_event=True,
-                                            show_state_attributes=True, show_conditions=True,
-                                            show_auto_transitions=True,
-                                            auto_transitions=False)
-        self.m.states.get(States.player_turn.name).add_callback('enter', self.next_turn)
-        self.m.add_transition(trigger='game_over', source=States.player_turn, dest=States.game_over),
-
-        self.m.add_transition(trigger='income', source=States.player_turn, dest=States.player_turn,
-                              before=self.do_income, unless=self.force_coup),
-        self.m.add_transition(trigger='coup', source=States.player_turn, dest=States.player_turn, before=self.do_coup),
-
-        # Foreign aid states
-        self.m.add_transition(trigger='foreign_aid', source=States.player_turn, dest=States.waiting_block_foreign_aid,
-                              unless=self.force_coup),
-        self.m.add_transition(trigger='decline_block_foreign_aid', source=States.waiting_block_foreign_aid,
-                              dest=States.player_turn, before='do_foreign_aid'),
-        self.m.add_transition(trigger='block_foreign_aid',
-                              source=States.waiting_block_foreign_aid, dest=States.waiting_challenge_block_foreign_aid,
-                              before=self.queue_block_foreign_aid),
-        self.m.add_transition(trigger='challenge_block_foreign_aid', source=States.waiting_challenge_block_foreign_aid,
-                              dest=States.player_turn, before=self.resolve_challenge_block_foreign_aid),
-        self.m.add_transition(trigger='decline_challenge_block_foreign_aid',
-                              source=States.waiting_challenge_block_foreign_aid,
-                              dest=States.player_turn),
-        # Assassinate states
-        self.m.add_transition(trigger='assassin', source=States.player_turn, dest=States.waiting_block_assassin,
-                              before=self.queue_assassin, unless=self.force_coup)
-        self.m.add_transition(trigger='challenge_assassin', source=States.waiting_block_assassin,
-                              dest=States.player_turn,
-                              before=self.resolve_challenge(self.get_player, 'assassin'))
-        self.m.add_transition(trigger='block_assassin', source=States.waiting_block_assassin,
-                              dest=States.waiting_challenge_block_assassin)
-        self.m.add_transition(trigger='decline_block_assassin', source=States.waiting_block_assassin,
-                              dest=States.player_turn, before=self.do_assassin)
-        self.m.add_transition(trigger='challenge_block_assassin', source=States.waiting_challenge_block_assassin,
-                              dest=States.player_turn,
-                              before=self.resolve_challenge(self.get_assassin_target, 'contessa'))
-        self.m.add_transition(trigger='decline_challenge_block_assassin',
-                              source=States.waiting_challenge_block_assassin,
-                              dest=States.player_turn)
-
-        # Duke states
-        self.m.add_transition(trigger='duke', source=States.player_turn, dest=States.waiting_challenge_duke,
-                              unless=self.force_coup)
-        self.m.add_transition(trigger='decline_challenge_duke', source=States.waiting_challenge_duke,
-                              dest=States.player_turn, before=self.do_duke)
-        self.m.add_transition(trigger='challenge_duke', source=States.waiting_challenge_duke, dest=States.player_turn,
-                              before=self.resolve_challenge(self.get_player, 'duke', self.do_duke))
-
-        # Captain states
-        self.m.add_transition(trigger='captain', source=States.player_turn, dest=States.waiting_challenge_captain,
-                              before=self.queue_captain, unless=self.force_coup)
-        self.m.add_transition(trigger='decline_block_captain', source=States.waiting_challenge_captain, dest=States.player_turn,
-                              before=self.do_captain)
-        self.m.add_transition(trigger='block_captain', source=States.waiting_challenge_captain,
-                              dest=States.waiting_challenge_block_captain)
-        self.m.add_transition(trigger='challenge_block_captain', source=States.waiting_challenge_block_captain,
-                              dest=States.player_turn, before=self.resolve_challenge(self.get_captain_target, 'captain', self.do_captain))
-        self.m.add_transition(trigger='decline_challenge_block_captain', source=States.waiting_challenge_block_captain,
-                              dest=States.player_turn)
-        self.m.add_transition(trigger='decline_challenge_captain', source=States.waiting_challenge_captain,
-                              dest=States.player_turn, before=self.do_captain)
-        self.m.add_transition(trigger='challenge_captain', source=States.waiting_challenge_captain,
-                              dest=States.player_turn,
-                              before=self.resolve_challenge(self.get_player, 'captain', self.do_captain))
-
-        # Ambassador states
-        self.m.add_transition(trigger='to_ambassador_trade', source=States.waiting_challenge_ambassador,
-                              dest=States.ambassador_trade)
-        self.m.add_transition(trigger='ambassador', source=States.player_turn, dest=States.waiting_challenge_ambassador,
-                              unless=self.force_coup)
-        self.m.add_transition(trigger='challenge_ambassador', source=States.waiting_challenge_ambassador,
-                              dest=States.player_turn,
-                              before=self.resolve_challenge(self.get_player, 'ambassador',
-                                                            lambda: self.trigger('to_ambassador_trade')))
-        self.m.add_transition(trigger='decline_challenge_ambassador', source=States.waiting_challenge_ambassador,
-                              dest=States.ambassador_trade)
-        self.m.add_transition(trigger='resolve_ambassador_trade', source=States.ambassador_trade,
-                              dest=States.player_turn)
-
-        self.m.get_graph().draw('coup.png', prog='dot')
+        # The topology is shared by every game, each game is only a model driven by it
+        self.m: Machine = get_machine()
+        self.state = States.player_turn
+        self._legal: tuple[Action, ...] | None = None
+        # Objects told about triggers, lost influence and exchanged cards, see coup.belief.Observer
+        self.observers: list = []
+
+    def trigger(self, trigger_name: str, *args, **kwargs) -> bool:
+        """
+        Trigger a transition on the shared machine with this game as the model.
+        :param trigger_name: name of the transition to trigger
+        :return bool: True if the transition was executed
+        """
+        try:
+            event = self.m.events[trigger_name]
+        except KeyError:
+            raise AttributeError(f"Do not know event named '{trigger_name}'.") from None
+        observers = self.observers
+        for observer in observers:
+            observer.before_trigger(self, trigger_name, kwargs)
+        try:
+            result = event.trigger(self, *args, **kwargs)
+        finally:
+            self._legal = None
+        if result:
+            self.history.append((trigger_name, kwargs, self.state))
+        for observer in observers:
+            observer.after_trigger(self, trigger_name, kwargs, result)
+        return result
+
+    def legal_actions(self) -> tuple[Action, ...]:
+        """
+        Every action that can be triggered in the current state, computed from the game rather than by probing the
+        machine. The result is cached until the next trigger.
+        :return: (trigger, player name) pairs, pass them to trigger with action_kwargs
+        """
+        if self._legal is not None:
+            return self._legal
+        current = self.current_player
+        active = [player.name for seat, player in enumerate(self.players) if self.alive >> seat & 1]
+        others = [name for name in active if name != current.name]
+        forced = current.coins >= 10
+        actions: list[Action] = []
+        for trigger in STATE_TRIGGERS[self.state]:
+            if forced and trigger in FORCE_COUP_GUARDED:
+                continue
+            if trigger == 'coup' and current.coins < 7 or trigger == 'assassin' and current.coins < 3:
+                continue
+            kwarg = ACTION_KWARGS.get(trigger)
+            if kwarg is None:
+                actions.append((trigger, None))
+            elif kwarg == 'challenger':
+                challenged = getattr(self, CHALLENGED[trigger]).name
+                actions.extend((trigger, name) for name in active if name != challenged)
+            else:
+                actions.extend((trigger, name) for name in others)
+        self._legal = tuple(actions)
+        return self._legal
+
+    def _fire(self, trigger_name: str):
+        # Transitions triggered by callbacks are a consequence of the outer trigger and are not recorded
+        self.m.events[trigger_name].trigger(self)
+
+    @classmethod
+    def replay(cls, players: list[Player], seed: int, history: list[tuple[str, dict[str, Any], States]],
+               debug=False) -> 'Coup':
+        """
+        Replay a game from its seed and history.
+        :param players: players in the same starting position as the original game
+        :param seed: the seed of the original game
+        :param history: the history of the original game
+        :return Coup: the game after the last transition in history
+        """
+        c = cls(players, debug=debug, seed=seed)
+        for i, (trigger_name, kwargs, state) in enumerate(history):
+            if not c.trigger(trigger_name, **kwargs) or c.state != state:
+                raise Exception(f'replay diverged at transition {i} ({trigger_name})')
+        return c
+
+    def __getattr__(self, name):
+        # Allows c.income() style calls without binding every trigger to every game, going through trigger so the
+        # call is recorded and observed like any other
+        if name not in get_machine().events:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        return partial(self.trigger, name)
+
+    @staticmethod
+    def export_diagram(path: str = 'coup.png', fmt: str | None = None) -> str:
+        """
+        Render the state machine diagram, see coup.diagram.
+        :param path: file to write
+        :param fmt: output format, defaults to the file extension
+        :return str: the path written
+        """
+        from coup.diagram import export_diagram
+        return export_diagram(path, fmt)
+
+    @property
+    def active_players(self) -> list[Player]:
+        """
+        :return: the players still in the game in turn order
+        """
+        return [player for seat, player in enumerate(self.players) if self.alive >> seat & 1]
+
+    def seat_of(self, player: Player | None) -> int | None:
+        """
+        :return: the seat of player, None if player is None
+        """
+        return None if player is None else self.seats[player.name]
+
+    def snapshot(self) -> tuple:
+        """
+        Capture the mutable game data, the random source is not included.
+        :return: an opaque snapshot for restore
+        """
+        return (self.state, self.player_index, self.alive, tuple(self._next), tuple(self._prev), bytes(self.deck.codes),
+                self.seat_of(self.assassin_target), self.seat_of(self.captain_target),
+                self.seat_of(self.foreign_aid_blocker),
+                tuple((player.coins, tuple(card.code | card.face_up << 3 for card in player.cards))
+                      for player in self.players),
+                len(self.history))
+
+    def restore(self, snapshot: tuple):
+        """
+        Put the game back in the position it was in when snapshot was taken.
+        :param snapshot: a snapshot taken from this game or a clone of it
+        """
+        (self.state, self.player_index, self.alive, next_seats, prev_seats, codes, assassin_target, captain_target,
+         foreign_aid_blocker, players, history) = snapshot
+        players_ = self.players
+        self._next[:] = next_seats
+        self._prev[:] = prev_seats
+        self.deck.codes[:] = codes
+        self.assassin_target = None if assassin_target is None else players_[assassin_target]
+        self.captain_target = None if captain_target is None else players_[captain_target]
+        self.foreign_aid_blocker = None if foreign_aid_blocker is None else players_[foreign_aid_blocker]
+        self.current_player = players_[self.player_index]
+        for player, (coins, cards) in zip(players_, players):
+            player.coins = coins
+            player.cards = [Card.from_code(card & 7, card > 7) for card in cards]
+            player._down = sum(1 for card in cards if card < 8)
+        del self.history[history:]
+        self._legal = None
+
+    def clone(self, rng: random.Random | None = None) -> 'Coup':
+        """
+        Copy the game without copying the machine.
+        :param rng: random source for the clone, by default a copy of this game's is made. Copying it is most of
+        the cost of cloning, search agents can pass their own.
+        :return Coup: an independent copy of the game
+        """
+        c = object.__new__(type(self))
+        c.debug = self.debug
+        c.seed = self.seed
+        if rng is None:
+            rng = random.Random()
+            rng.setstate(self.rng.getstate())
+        c.rng = rng
+        c.history = self.history.copy()
+        c.setup = self.setup
+        c.m = self.m
+        c.state = self.state
+        c._legal = self._legal
+        # Observers follow the game they were attached to, not its copies
+        c.observers = []
+        c.ambassador_cards = self.ambassador_cards
+        c.player_index = self.player_index
+        c.players = []
+        for player in self.players:
+            copy = object.__new__(Player)
+            copy.name = player.name
+            copy.coins = player.coins
+            copy.cards = [Card.from_code(card.code, card.face_up) for card in player.cards]
+            copy._down = player._down
+            c.players.append(copy)
+        c.alive = self.alive
+        c.seats = self.seats
+        c._next = self._next.copy()
+        c._prev = self._prev.copy()
+        c.deck = object.__new__(Deck)
+        c.deck.rng = c.rng
+        c.deck.codes = self.deck.codes.copy()
+        c.current_player = c.players[self.player_index]
+        c.assassin_target = None if self.assassin_target is None else c.players[self.seat_of(self.assassin_target)]
+        c.captain_target = None if self.captain_target is None else c.players[self.seat_of(self.captain_target)]
+        c.foreign_aid_blocker = None if self.foreign_aid_blocker is None else \
+            c.players[self.seat_of(self.foreign_aid_blocker)]
+        return c
 
     def __repr__(self):
         return f'State: {self.state}\n' + '\n'.join([str(player) for player in self.active_players])
@@ -133,6 +271,8 @@ class Coup:
     def exchange_card(self, player: Player, card: Card):
         self.deck.return_to_deck(card)
         player.draw(self.deck.draw())
+        for observer in self.observers:
+            observer.on_exchange(self, player, card)
 
     def get_player(self, name: str | None = None, active: bool = True) -> Player | None:
         """
@@ -141,22 +281,26 @@ class Coup:
         :param name: name of player to return
         :return:
         """
-        search_list = self.active_players if active else self.players
         if not name:
             return self.current_player
-        for player in search_list:
-            if player.name == name:
-                return player
-        return None
+        seat = self.seats.get(name)
+        if seat is None or (active and not self.alive >> seat & 1):
+            return None
+        return self.players[seat]
 
     def next_turn(self, event):
         self.assassin_target = None
         self.foreign_aid_blocker = None
         self.captain_target = None
-        if not self.debug and len(self.active_players) == 0:
-            self.trigger('game_over')
-        self.player_index = (self.player_index + 1) % len(self.active_players)
-        self.current_player = self.active_players[self.player_index]
+        if not self.alive or (not self.debug and self.alive & (self.alive - 1) == 0):
+            self._fire('game_over')
+            return
+        # The seat we are leaving may have been eliminated, its link still leads on around the table
+        seat = self._next[self.player_index]
+        while not self.alive >> seat & 1:
+            seat = self._next[seat]
+        self.player_index = seat
+        self.current_player = self.players[seat]
 
     def do_income(self, event=None):
         self.current_player.coins += 1
@@ -168,8 +312,8 @@ class Coup:
         target = self.get_player(event.kwargs.get('target'))
         if self.current_player.coins < 7:
             raise Exception('need at least 7 coins')
-        if not target:
-            raise Exception('undefined target')
+        if not target or target == self.current_player:
+            raise Exception('invalid target')
         self.current_player.coins -= 7
         self.lose_influence(target)
 
@@ -180,9 +324,16 @@ class Coup:
         self.current_player.coins += 3
 
     def lose_influence(self, target: Player):
-        target.lose_influence()
+        card = target.lose_influence()
+        for observer in self.observers:
+            observer.on_lose_influence(self, target, card)
         if target.is_dead():
-            self.active_players.remove(target)
+            seat = self.seats[target.name]
+            if self.alive >> seat & 1:
+                self.alive &= ~(1 << seat)
+                # Unlink the seat from the turn order
+                self._next[self._prev[seat]] = self._next[seat]
+                self._prev[self._next[seat]] = self._prev[seat]
 
     def resolve_challenge_block_foreign_aid(self, event: EventData):
         blocker: Player = self.foreign_aid_blocker
@@ -211,7 +362,9 @@ class Coup:
         self.foreign_aid_blocker = blocker
 
     def queue_captain(self, event: EventData):
-        target = self.get_player(event.kwargs.get('target'))
+        target: Player = self.get_player(event.kwargs.get('target'))
+        if not target or target == self.current_player:
+            raise Exception('invalid target')
         self.captain_target = target
 
     def do_captain(self, event: EventData | None = None):
@@ -224,28 +377,162 @@ class Coup:
             self.current_player.coins += self.captain_target.coins
             self.captain_target.coins = 0
 
-    def resolve_challenge(self, get_challenged: Callable[..., Player], card_name: str, callback=None):
-        def part(event: EventData):
-            challenged: Player = get_challenged()
-            challenger = self.get_player(get_target(event))
-            if not challenger or not get_target(event):
-                raise Exception(f'challenger {get_target(event)} is not defined')
-            if card := challenged.show(card_name):
-                # The challenged won
-                self.lose_influence(challenger)
-                self.exchange_card(challenged, card)
-                if callback:
-                    callback()
-            else:
-                # The challenger won
-                self.lose_influence(challenged)
-        return part
+    def resolve_challenge(self, event: EventData, challenged: Player, card_name: str, callback=None):
+        challenger = self.get_player(get_target(event))
+        if not challenger or not get_target(event):
+            raise Exception(f'challenger {get_target(event)} is not defined')
+        if challenger == challenged:
+            raise Exception('invalid challenger')
+        if card := challenged.show(card_name):
+            # The challenged won
+            self.lose_influence(challenger)
+            self.exchange_card(challenged, card)
+            if callback:
+                callback()
+        else:
+            # The challenger won
+            self.lose_influence(challenged)
+
+    def resolve_challenge_assassin(self, event: EventData):
+        self.resolve_challenge(event, self.current_player, 'assassin')
+
+    def resolve_challenge_block_assassin(self, event: EventData):
+        self.resolve_challenge(event, self.get_assassin_target(), 'contessa')
+
+    def resolve_challenge_duke(self, event: EventData):
+        self.resolve_challenge(event, self.current_player, 'duke', self.do_duke)
+
+    def resolve_challenge_block_captain(self, event: EventData):
+        self.resolve_challenge(event, self.get_captain_target(), 'captain', self.do_captain)
+
+    def resolve_challenge_captain(self, event: EventData):
+        self.resolve_challenge(event, self.current_player, 'captain', self.do_captain)
+
+    def resolve_challenge_ambassador(self, event: EventData):
+        self.resolve_challenge(event, self.current_player, 'ambassador', lambda: self._fire('to_ambassador_trade'))
 
 
 def get_target(event: EventData):
     return event.kwargs.get('target') or event.kwargs.get('challenger') or event.kwargs.get('blocker')
 
 
+# Callbacks and conditions are referenced by name so they resolve against whichever game is being driven
+TRANSITIONS: list[dict[str, Any]] = [
+    dict(trigger='game_over', source=States.player_turn, dest=States.game_over),
+
+    dict(trigger='income', source=States.player_turn, dest=States.player_turn, before='do_income',
+         unless='force_coup'),
+    dict(trigger='coup', source=States.player_turn, dest=States.player_turn, before='do_coup'),
+
+    # Foreign aid states
+    dict(trigger='foreign_aid', source=States.player_turn, dest=States.waiting_block_foreign_aid,
+         unless='force_coup'),
+    dict(trigger='decline_block_foreign_aid', source=States.waiting_block_foreign_aid,
+         dest=States.player_turn, before='do_foreign_aid'),
+    dict(trigger='block_foreign_aid', source=States.waiting_block_foreign_aid,
+         dest=States.waiting_challenge_block_foreign_aid, before='queue_block_foreign_aid'),
+    dict(trigger='challenge_block_foreign_aid', source=States.waiting_challenge_block_foreign_aid,
+         dest=States.player_turn, before='resolve_challenge_block_foreign_aid'),
+    dict(trigger='decline_challenge_block_foreign_aid', source=States.waiting_challenge_block_foreign_aid,
+         dest=States.player_turn),
+
+    # Assassinate states
+    dict(trigger='assassin', source=States.player_turn, dest=States.waiting_block_assassin,
+         before='queue_assassin', unless='force_coup'),
+    dict(trigger='challenge_assassin', source=States.waiting_block_assassin, dest=States.player_turn,
+         before='resolve_challenge_assassin'),
+    dict(trigger='block_assassin', source=States.waiting_block_assassin,
+         dest=States.waiting_challenge_block_assassin),
+    dict(trigger='decline_block_assassin', source=States.waiting_block_assassin, dest=States.player_turn,
+         before='do_assassin'),
+    dict(trigger='challenge_block_assassin', source=States.waiting_challenge_block_assassin,
+         dest=States.player_turn, before='resolve_challenge_block_assassin'),
+    dict(trigger='decline_challenge_block_assassin', source=States.waiting_challenge_block_assassin,
+         dest=States.player_turn),
+
+    # Duke states
+    dict(trigger='duke', source=States.player_turn, dest=States.waiting_challenge_duke, unless='force_coup'),
+    dict(trigger='decline_challenge_duke', source=States.waiting_challenge_duke, dest=States.player_turn,
+         before='do_duke'),
+    dict(trigger='challenge_duke', source=States.waiting_challenge_duke, dest=States.player_turn,
+         before='resolve_challenge_duke'),
+
+    # Captain states
+    dict(trigger='captain', source=States.player_turn, dest=States.waiting_challenge_captain,
+         before='queue_captain', unless='force_coup'),
+    dict(trigger='decline_block_captain', source=States.waiting_challenge_captain, dest=States.player_turn,
+         before='do_captain'),
+    dict(trigger='block_captain', source=States.waiting_challenge_captain,
+         dest=States.waiting_challenge_block_captain),
+    dict(trigger='challenge_block_captain', source=States.waiting_challenge_block_captain,
+         dest=States.player_turn, before='resolve_challenge_block_captain'),
+    dict(trigger='decline_challenge_block_captain', source=States.waiting_challenge_block_captain,
+         dest=States.player_turn),
+    dict(trigger='decline_challenge_captain', source=States.waiting_challenge_captain, dest=States.player_turn,
+         before='do_captain'),
+    dict(trigger='challenge_captain', source=States.waiting_challenge_captain, dest=States.player_turn,
+         before='resolve_challenge_captain'),
+
+    # Ambassador states
+    dict(trigger='to_ambassador_trade', source=States.waiting_challenge_ambassador, dest=States.ambassador_trade),
+    dict(trigger='ambassador', source=States.player_turn, dest=States.waiting_challenge_ambassador,
+         unless='force_coup'),
+    dict(trigger='challenge_ambassador', source=States.waiting_challenge_ambassador, dest=States.player_turn,
+         before='resolve_challenge_ambassador'),
+    dict(trigger='decline_challenge_ambassador', source=States.waiting_challenge_ambassador,
+         dest=States.ambassador_trade),
+    dict(trigger='resolve_ambassador_trade', source=States.ambassador_trade, dest=States.player_turn),
+]
+
+# The keyword each parameterized trigger takes a player's name as
+ACTION_KWARGS = {'coup': 'target', 'assassin': 'target', 'captain': 'target', 'block_foreign_aid': 'blocker',
+                 'challenge_assassin': 'challenger', 'challenge_block_assassin': 'challenger',
+                 'challenge_duke': 'challenger', 'challenge_captain': 'challenger',
+                 'challenge_block_captain': 'challenger', 'challenge_ambassador': 'challenger'}
+# The Coup attribute holding the player each challenge is against, they can't challenge themselves
+CHALLENGED = {'challenge_assassin': 'current_player', 'challenge_block_assassin': 'assassin_target',
+              'challenge_duke': 'current_player', 'challenge_captain': 'current_player',
+              'challenge_block_captain': 'captain_target', 'challenge_ambassador': 'current_player'}
+# Triggers fired by the game itself, players never take them
+INTERNAL_TRIGGERS = {'game_over', 'to_ambassador_trade'}
+FORCE_COUP_GUARDED = {transition['trigger'] for transition in TRANSITIONS if transition.get('unless') == 'force_coup'}
+STATE_TRIGGERS: dict[States, list[str]] = {
+    state: list(dict.fromkeys(transition['trigger'] for transition in TRANSITIONS
+                              if transition['source'] == state and transition['trigger'] not in INTERNAL_TRIGGERS))
+    for state in States}
+
+
+def action_kwargs(action: Action) -> dict[str, str]:
+    """
+    :return: the keyword arguments to pass to Coup.trigger for action
+    """
+    trigger, name = action
+    if name is None:
+        return {}
+    return {ACTION_KWARGS[trigger]: name}
+
+
+def build_machine(machine_cls: type[Machine] = Machine, **kwargs) -> Machine:
+    """
+    Builds a machine with the Coup topology.
+    :param machine_cls: the transitions machine class to build
+    :param kwargs: extra arguments passed on to the machine
+    :return: the machine, without any games attached
+    """
+    m = machine_cls(states=States, initial=States.player_turn, send_event=True, auto_transitions=False, **kwargs)
+    m.states.get(States.player_turn.name).add_callback('enter', 'next_turn')
+    m.add_transitions(TRANSITIONS)
+    return m
+
+
+@cache
+def get_machine() -> Machine:
+    """
+    :return: the machine shared by every game in this process
+    """
+    return build_machine(model=None)
+
+
 if __name__ == '__main__':
     players = [Player(name='hi', coins=12)]
     c = Coup(players, debug=True)
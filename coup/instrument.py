@@ -0,0 +1,131 @@
+"""
+Opt-in counts and timings of triggers and callbacks.
+instrument() returns a subclass of Coup whose trigger and callbacks record into a Profile. Games built from Coup
+itself are untouched, so leaving instrumentation off costs nothing.
+
+    profile = Profile()
+    stats = run_games(1000, agents, seed=1, profile=profile)
+    print(profile.to_prometheus())
+"""
+import json
+import time
+from functools import wraps
+from typing import Any, Callable
+
+from coup.game import TRANSITIONS, Coup
+
+# Callbacks named in TRANSITIONS, plus the ones the machine and the resolve callbacks call
+CALLBACKS = tuple(dict.fromkeys(
+    [name for transition in TRANSITIONS for key in ('before', 'after', 'conditions', 'unless')
+     if isinstance(name := transition.get(key), str)] +
+    ['next_turn', 'resolve_challenge', 'lose_influence', 'exchange_card', 'do_captain', 'do_duke', 'do_foreign_aid',
+     'do_assassin']))
+
+
+class Profile:
+    """
+    Call counts and cumulative wall time per trigger and per callback. Times are inclusive, a callback's time
+    includes the callbacks it calls and a trigger's time includes all of its callbacks.
+    """
+
+    def __init__(self):
+        # name: [calls, seconds]
+        self.triggers: dict[str, list] = {}
+        self.callbacks: dict[str, list] = {}
+        # Instrumented subclasses recording into this profile, kept here so they go away with it
+        self.classes: dict[type[Coup], type[Coup]] = {}
+
+    def reset(self):
+        self.triggers.clear()
+        self.callbacks.clear()
+
+    def merge(self, other: 'Profile'):
+        for mine, theirs in ((self.triggers, other.triggers), (self.callbacks, other.callbacks)):
+            for name, (calls, seconds) in theirs.items():
+                entry = mine.setdefault(name, [0, 0.0])
+                entry[0] += calls
+                entry[1] += seconds
+
+    def to_dict(self) -> dict[str, dict[str, dict[str, Any]]]:
+        return {kind: {name: {'calls': calls, 'seconds': seconds} for name, (calls, seconds) in entries.items()}
+                for kind, entries in (('triggers', self.triggers), ('callbacks', self.callbacks))}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    def to_prometheus(self) -> str:
+        """
+        :return: a snapshot in the Prometheus text exposition format
+        """
+        lines = []
+        for kind, label, entries in (('trigger', 'trigger', self.triggers), ('callback', 'callback', self.callbacks)):
+            for metric, index, help_text in (('calls_total', 0, 'calls'), ('seconds_total', 1, 'wall time')):
+                name = f'coup_{kind}_{metric}'
+                lines.append(f'# HELP {name} Cumulative {help_text} per {kind}.')
+                lines.append(f'# TYPE {name} counter')
+                for key in sorted(entries):
+                    lines.append(f'{name}{{{label}="{key}"}} {entries[key][index]}')
+        return '\n'.join(lines) + '\n'
+
+    def __repr__(self):
+        rows = sorted([(seconds, calls, name) for kind in (self.triggers, self.callbacks)
+                       for name, (calls, seconds) in kind.items()], reverse=True)
+        return '\n'.join(f'{name:>40} {calls:>10} calls {seconds * 1e3:10.2f} ms' for seconds, calls, name in rows)
+
+
+def _timed(method: Callable, entries: dict[str, list], name: str) -> Callable:
+    clock = time.perf_counter
+
+    @wraps(method)
+    def timed(self, *args, **kwargs):
+        start = clock()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            elapsed = clock() - start
+            entry = entries.get(name)
+            if entry is None:
+                entries[name] = [1, elapsed]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+    return timed
+
+
+def instrument(profile: Profile, cls: type[Coup] = Coup) -> type[Coup]:
+    """
+    :param profile: where the subclass records
+    :param cls: the game class to instrument
+    :return: a subclass of cls recording every trigger and callback into profile, the same one for every call
+    """
+    subclass = profile.classes.get(cls)
+    if subclass is None:
+        subclass = profile.classes[cls] = _subclass(profile, cls)
+    return subclass
+
+
+def _subclass(profile: Profile, cls: type[Coup]) -> type[Coup]:
+    namespace: dict[str, Any] = {'__slots__': ()}
+    trigger = cls.trigger
+    triggers = profile.triggers
+    clock = time.perf_counter
+
+    # Recorded under the name of the trigger rather than the method
+    @wraps(trigger)
+    def timed_trigger(self, trigger_name: str, *args, **kwargs) -> bool:
+        start = clock()
+        try:
+            return trigger(self, trigger_name, *args, **kwargs)
+        finally:
+            elapsed = clock() - start
+            entry = triggers.get(trigger_name)
+            if entry is None:
+                triggers[trigger_name] = [1, elapsed]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+
+    namespace['trigger'] = timed_trigger
+    for name in CALLBACKS:
+        namespace[name] = _timed(getattr(cls, name), profile.callbacks, name)
+    return type(f'Instrumented{cls.__name__}', (cls,), namespace)
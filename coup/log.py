@@ -0,0 +1,249 @@
+"""
+Compact binary logs of complete games.
+
+A log is a sequence of 8 byte records, each an opcode, a byte argument and three 16 bit arguments. Strings (player
+names, triggers and keyword names) are written once and referred to by id afterwards. A game is written as:
+
+    GAME    n players, number of records in the game | seed in the following record
+    PLAYER  starting coins, name id, number of pre-dealt cards
+    CARD    card code, face up             (one per pre-dealt card)
+    TRIGGER resulting state, trigger id, keyword id, value id
+    KWARG   keyword id, value id           (extra keyword arguments of the previous trigger)
+
+Run `python -m coup.log games.bin [--game i]` to summarise a log or print one game.
+"""
+import argparse
+import mmap
+import os
+import struct
+from typing import Any, Iterator
+
+from coup.deck import Card
+from coup.game import Coup
+from coup.player import Player
+from coup.states import States
+
+MAGIC = b'COUPLOG\x01'
+RECORD = struct.Struct('<BBHHH')
+SEED = struct.Struct('<Q')
+
+OP_STRING = 1
+OP_RESET = 2
+OP_GAME = 3
+OP_PLAYER = 4
+OP_CARD = 5
+OP_TRIGGER = 6
+OP_KWARG = 7
+
+NONE = 0xffff
+# Ids are 16 bit, the string table is started over once it is full
+MAX_STRINGS = 0xffff
+STATES = list(States)
+STATE_CODES = {state: code for code, state in enumerate(STATES)}
+
+
+class LogWriter:
+    """
+    Appends games to a log file.
+    """
+
+    def __init__(self, path: str, buffer_size: int = 1 << 16):
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, 'ab')
+        self.buffer = bytearray(MAGIC if new else b'')
+        self.buffer_size = buffer_size
+        self.strings: dict[str, int] = {}
+        if not new:
+            # Ids written by an earlier writer are unknown here, start a new table
+            self.buffer += RECORD.pack(OP_RESET, 0, 0, 0, 0)
+
+    def string_id(self, value: str) -> int:
+        if (string_id := self.strings.get(value)) is not None:
+            return string_id
+        data = value.encode()
+        if len(data) > 0xff:
+            raise Exception(f'string too long to log: {value}')
+        string_id = self.strings[value] = len(self.strings)
+        self.buffer += RECORD.pack(OP_STRING, len(data), string_id, 0, 0)
+        self.buffer += data.ljust(-(-len(data) // RECORD.size) * RECORD.size, b'\0')
+        return string_id
+
+    def write_game(self, game: Coup):
+        """
+        Append a game from its setup and history.
+        :param game: the game to write, its seed must fit in 64 bits
+        """
+        if game.seed is None or not 0 <= game.seed < 1 << 64:
+            raise Exception('only games with a 64 bit seed can be logged')
+        # Strings are defined ahead of the game so its records are contiguous, and the table is started over
+        # beforehand if they might not all fit
+        new = {name for name, _, _ in game.setup}
+        for trigger, kwargs, _ in game.history:
+            new.add(trigger)
+            new.update(kwargs)
+            new.update(kwargs.values())
+        if len(self.strings) + len(new.difference(self.strings)) > MAX_STRINGS:
+            self.strings.clear()
+            self.buffer += RECORD.pack(OP_RESET, 0, 0, 0, 0)
+        body = bytearray()
+        for name, coins, cards in game.setup:
+            body += RECORD.pack(OP_PLAYER, coins, self.string_id(name), len(cards), 0)
+            for code, face_up in cards:
+                body += RECORD.pack(OP_CARD, code, int(face_up), 0, 0)
+        for trigger, kwargs, state in game.history:
+            items = [(self.string_id(key), self.string_id(value)) for key, value in kwargs.items()]
+            key, value = items[0] if items else (NONE, NONE)
+            body += RECORD.pack(OP_TRIGGER, STATE_CODES[state], self.string_id(trigger), key, value)
+            for key, value in items[1:]:
+                body += RECORD.pack(OP_KWARG, 0, 0, key, value)
+
+        n = len(body) // RECORD.size
+        self.buffer += RECORD.pack(OP_GAME, len(game.setup), 0, n & 0xffff, n >> 16)
+        self.buffer += SEED.pack(game.seed)
+        self.buffer += body
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        self.file.write(self.buffer)
+        self.buffer.clear()
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class GameRecord:
+    """
+    A game in a log, its records are only decoded when accessed.
+    """
+
+    def __init__(self, data: mmap.mmap, offset: int, n: int, seed: int, strings: list[str]):
+        self.data = data
+        self.offset = offset
+        self.n = n
+        self.seed = seed
+        self.strings = strings
+
+    def _records(self) -> Iterator[tuple[int, int, int, int, int]]:
+        for offset in range(self.offset, self.offset + self.n * RECORD.size, RECORD.size):
+            yield RECORD.unpack_from(self.data, offset)
+
+    @property
+    def setup(self) -> list[tuple[str, int, list[tuple[int, bool]]]]:
+        setup = []
+        for op, aux, a, b, _ in self._records():
+            if op == OP_PLAYER:
+                setup.append((self.strings[a], aux, []))
+            elif op == OP_CARD:
+                setup[-1][2].append((aux, bool(a)))
+            else:
+                break
+        return setup
+
+    @property
+    def history(self) -> list[tuple[str, dict[str, Any], States]]:
+        strings = self.strings
+        history = []
+        for op, aux, a, b, c in self._records():
+            if op == OP_TRIGGER:
+                history.append((strings[a], {} if b == NONE else {strings[b]: strings[c]}, STATES[aux]))
+            elif op == OP_KWARG:
+                history[-1][1][strings[b]] = strings[c]
+        return history
+
+    def players(self) -> list[Player]:
+        """
+        :return: new players in the game's starting position
+        """
+        return [Player(name, cards=[Card.from_code(code, face_up) for code, face_up in cards], coins=coins)
+                for name, coins, cards in self.setup]
+
+    def replay(self, debug=False) -> Coup:
+        """
+        :return Coup: a live game after the last logged transition
+        """
+        return Coup.replay(self.players(), self.seed, self.history, debug=debug)
+
+
+class LogReader:
+    """
+    Reads a log through a memory map, games are found lazily while iterating.
+    """
+
+    def __init__(self, path: str):
+        self.file = open(path, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.data[:len(MAGIC)] != MAGIC:
+            raise Exception(f'{path} is not a game log')
+
+    def __iter__(self) -> Iterator[GameRecord]:
+        data = self.data
+        strings: list[str] = []
+        offset = len(MAGIC)
+        end = len(data)
+        while offset < end:
+            op, aux, a, b, c = RECORD.unpack_from(data, offset)
+            offset += RECORD.size
+            if op == OP_STRING:
+                strings.append(data[offset:offset + aux].decode())
+                offset += -(-aux // RECORD.size) * RECORD.size
+            elif op == OP_RESET:
+                # Records already handed out keep the old table
+                strings = []
+            elif op == OP_GAME:
+                seed, = SEED.unpack_from(data, offset)
+                n = b | c << 16
+                offset += RECORD.size
+                yield GameRecord(data, offset, n, seed, strings)
+                offset += n * RECORD.size
+            else:
+                raise Exception(f'unexpected record {op} at offset {offset - RECORD.size}')
+
+    def game(self, index: int) -> GameRecord:
+        """
+        :return GameRecord: the game at index, found by skipping over the ones before it
+        """
+        for i, record in enumerate(self):
+            if i == index:
+                return record
+        raise IndexError(index)
+
+    def count(self) -> int:
+        return sum(1 for _ in self)
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description='Summarise a game log or print one of its games')
+    parser.add_argument('path')
+    parser.add_argument('--game', type=int, default=None, help='replay and print this game')
+    args = parser.parse_args(argv)
+    with LogReader(args.path) as reader:
+        if args.game is None:
+            print(f'{reader.count()} games')
+        else:
+            record = reader.game(args.game)
+            for trigger, kwargs, state in record.history:
+                print(trigger, kwargs, state.name)
+            print(record.replay())
+
+
+if __name__ == '__main__':
+    main()
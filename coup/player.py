@@ -1,11 +1,15 @@
-from coup.deck import Card
+from coup.deck import Card, card_codes
 
 
 class Player:
+    __slots__ = ('name', 'coins', 'cards', '_down')
+
     def __init__(self, name, cards=None, coins=2) -> None:
         self.name = name
         self.coins = coins
         self.cards: list[Card] = cards or []
+        # Number of face down cards, kept up to date so influence checks don't scan the hand
+        self._down = sum(1 for card in self.cards if not card.face_up)
 
     def __repr__(self):
         return f'{self.name}: {self.coins} coins, cards: {self.cards}'
@@ -16,42 +20,54 @@ class Player:
         :parameter str name: the name of the card to return
         :return Card: the card return
         """
-        for card in self.cards:
-            if card.name == name:
-                self.cards.remove(Card(name))
+        code = card_codes[name]
+        for i, card in enumerate(self.cards):
+            if card.code == code:
+                del self.cards[i]
+                if not card.face_up:
+                    self._down -= 1
                 return card
         return None
 
     def lose_influence(self, name: str | None = None):
         """
         force a player to lose influence.
-        :param name: if provided, flip this card over
-        :return:
+        :param name: if provided, flip this card over if the player has it face down
+        :return Card: the card flipped over, None if the player had no influence left
         """
+        if not self._down:
+            return None
+        flip = None
         for card in self.cards:
-            if name:
-                if card.face_up is False and card.name == name:
-                    card.face_up = True
-                    return
-            if card.face_up is False:
-                card.face_up = True
-                return
+            if not card.face_up:
+                if name is None or card.name == name:
+                    flip = card
+                    break
+                if flip is None:
+                    flip = card
+        flip.face_up = True
+        self._down -= 1
+        return flip
 
     def is_dead(self) -> bool:
         """
         :return bool: returns if the player is dead
         """
-        return self.influence() == 0
+        return self._down == 0
 
     def draw(self, card: Card):
         self.cards.append(card)
+        if not card.face_up:
+            self._down += 1
 
     def influence(self) -> int:
         """
         :return int: returns the number of influence left
         """
-        influence = 0
-        for card in self.cards:
-            if card.face_up is False:
-                influence += 1
-        return influence
+        return self._down
+
+    def revealed(self) -> int:
+        """
+        :return int: returns the number of face up cards
+        """
+        return len(self.cards) - self._down
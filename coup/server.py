@@ -0,0 +1,373 @@
+"""
+Hosts many Coup tables in one asyncio event loop over a JSON lines TCP protocol.
+
+Clients send one JSON object per line:
+    {"op": "join", "table": "t1", "name": "alice", "players": 2}    join a table, it starts once it is full
+    {"op": "trigger", "id": 1, "trigger": "coup", "kwargs": {"target": "bob"}}
+Triggers are answered with {"op": "ok", "id": 1} or {"op": "error", "id": 1, "error": "..."}. After every change to
+a table each of its players is sent {"op": "update", "trigger": ..., "kwargs": ..., "diff": ..., "hand": ...,
+"actions": ...} with the public state that changed, their own cards and the actions they may take.
+In response states passing is sent as the decline trigger, the decline is taken once every player who may respond
+has passed, as in coup.sim. A player who disconnects from a game in progress forfeits and the game ends, the last
+update carries the winner.
+
+Run `python -m coup.server serve --port 8765` to host tables and
+`python -m coup.server load --connections 2000 --port 8765` to load test a running server.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Callable
+
+from coup.game import ACTION_KWARGS, Action, Coup
+from coup.player import Player
+from coup.sim import MAX_ACTIONS, RESPONSES, response_options
+from coup.states import States
+
+
+class Client:
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.name: str | None = None
+        self.table: 'Table | None' = None
+
+    def send(self, message: dict[str, Any]):
+        if not self.writer.is_closing():
+            self.writer.write(json.dumps(message).encode() + b'\n')
+
+
+class Table:
+    """
+    One game and its players. Triggers are queued and applied one at a time by the table's own task.
+    """
+
+    def __init__(self, name: str, players: int, seed: int, max_actions: int = MAX_ACTIONS,
+                 on_close: Callable[['Table'], None] | None = None):
+        """
+        :param on_close: called once the game is over or everybody left before it started
+        """
+        self.name = name
+        self.on_close = on_close
+        self.size = players
+        self.seed = seed
+        self.max_actions = max_actions
+        self.clients: dict[str, Client] = {}
+        self.game: Coup | None = None
+        self.queue: asyncio.Queue[tuple[Client, dict[str, Any]]] = asyncio.Queue()
+        # Players who passed in the current response state
+        self.passed: set[str] = set()
+        self.view: dict[str, Any] = {}
+        # Set when a player left the game before it was over
+        self.abandoned = False
+        self.task = asyncio.create_task(self.run())
+
+    def join(self, client: Client, name: str):
+        if self.game is not None:
+            raise Exception('the table has started')
+        if name in self.clients:
+            raise Exception(f'{name} is already at the table')
+        self.clients[name] = client
+        client.name = name
+        client.table = self
+        if len(self.clients) == self.size:
+            self.game = Coup([Player(name) for name in self.clients], seed=self.seed)
+            self.broadcast(None, {})
+
+    def leave(self, client: Client):
+        """
+        Remove client from the table. A player leaving a game in progress forfeits and the game ends, the others
+        would otherwise wait on them forever.
+        """
+        if self.clients.get(client.name) is not client:
+            return
+        del self.clients[client.name]
+        for other in self.clients.values():
+            other.send({'op': 'left', 'name': client.name})
+        game = self.game
+        if game is not None and not self.over:
+            player = game.get_player(client.name)
+            while player is not None and not player.is_dead():
+                game.lose_influence(player)
+            self.abandoned = True
+            self.broadcast(None, {})
+        elif not self.clients:
+            self.close()
+
+    @property
+    def over(self) -> bool:
+        game = self.game
+        return game is not None and (self.abandoned or game.state is States.game_over or
+                                     len(game.history) >= self.max_actions)
+
+    def close(self):
+        self.task.cancel()
+        if self.on_close is not None:
+            self.on_close(self)
+            self.on_close = None
+
+    async def run(self):
+        while True:
+            client, message = await self.queue.get()
+            try:
+                self.apply(client, message)
+            except Exception as e:
+                client.send({'op': 'error', 'id': message.get('id'), 'error': str(e)})
+            else:
+                client.send({'op': 'ok', 'id': message.get('id')})
+
+    def responders(self) -> list[Player]:
+        """
+        :return: the players who may respond in the current state, in turn order
+        """
+        game = self.game
+        claimant = getattr(game, RESPONSES[game.state][0])
+        players = game.players
+        responders = []
+        for i in range(len(players)):
+            seat = (game.player_index + i) % len(players)
+            player = players[seat]
+            if game.alive >> seat & 1 and player is not claimant and response_options(game, player):
+                responders.append(player)
+        return responders
+
+    def actions_for(self, name: str) -> list[Action]:
+        """
+        :return: the actions the player called name may send now
+        """
+        game = self.game
+        if game is None or self.over:
+            return []
+        if game.state not in RESPONSES:
+            return list(game.legal_actions()) if game.current_player.name == name else []
+        player = game.get_player(name)
+        if player is None or name in self.passed or player not in self.responders():
+            return []
+        return response_options(game, player) + [(RESPONSES[game.state][2], None)]
+
+    def apply(self, client: Client, message: dict[str, Any]):
+        """
+        Validate a trigger message from client and run it on the game.
+        """
+        game = self.game
+        if game is None:
+            raise Exception('the table has not started')
+        trigger = message.get('trigger')
+        kwargs = message.get('kwargs') or {}
+        if not isinstance(trigger, str) or not isinstance(kwargs, dict):
+            raise Exception('a trigger needs a name and keyword arguments')
+        kwarg = ACTION_KWARGS.get(trigger)
+        if set(kwargs) != ({kwarg} if kwarg else set()):
+            raise Exception(f'{trigger} takes {kwarg or "no arguments"}')
+        action = (trigger, kwargs.get(kwarg) if kwarg else None)
+        if action not in self.actions_for(client.name):
+            raise Exception(f'{client.name} cannot {trigger} now')
+
+        state = game.state
+        if state in RESPONSES and trigger == RESPONSES[state][2]:
+            self.passed.add(client.name)
+            if any(player.name not in self.passed for player in self.responders()):
+                return
+        if not game.trigger(trigger, **kwargs):
+            raise Exception(f'{trigger} was not executed')
+        self.passed.clear()
+        self.broadcast(trigger, kwargs)
+
+    def public_view(self) -> dict[str, Any]:
+        game = self.game
+        return {
+            'state': game.state.name,
+            'current': game.current_player.name,
+            'assassin_target': game.assassin_target and game.assassin_target.name,
+            'captain_target': game.captain_target and game.captain_target.name,
+            'blocker': game.foreign_aid_blocker and game.foreign_aid_blocker.name,
+            'players': {player.name: {'coins': player.coins, 'influence': player.influence(),
+                                      'revealed': [card.name for card in player.cards if card.face_up]}
+                        for player in game.players},
+        }
+
+    def broadcast(self, trigger: str | None, kwargs: dict[str, Any]):
+        """
+        Send every player the public state that changed since the last update.
+        """
+        view = self.public_view()
+        old = self.view
+        diff = {key: value for key, value in view.items() if key != 'players' and old.get(key, ()) != value}
+        old_players = old.get('players', {})
+        players = {name: value for name, value in view['players'].items() if old_players.get(name) != value}
+        if players:
+            diff['players'] = players
+        self.view = view
+        game = self.game
+        over = self.over
+        for name, client in self.clients.items():
+            player = game.get_player(name, active=False)
+            message = {'op': 'update', 'trigger': trigger, 'kwargs': kwargs, 'diff': diff,
+                       'hand': [card.name for card in player.cards if not card.face_up],
+                       'actions': self.actions_for(name)}
+            if over:
+                # The last player standing, nobody if the game ran out of actions or was left with several alive
+                message['winner'] = game.players[game.alive.bit_length() - 1].name \
+                    if game.alive & (game.alive - 1) == 0 else None
+            client.send(message)
+        if over:
+            self.close()
+
+
+class CoupServer:
+    """
+    Accepts clients and hosts their tables.
+    """
+
+    def __init__(self, seed: int | None = None, max_actions: int = MAX_ACTIONS):
+        self.rng = random.Random(seed)
+        self.max_actions = max_actions
+        self.tables: dict[str, Table] = {}
+        self.server: asyncio.Server | None = None
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> asyncio.Server:
+        """
+        :param port: port to listen on, 0 picks a free one
+        :return: the listening server, its port is in server.sockets[0].getsockname()
+        """
+        self.server = await asyncio.start_server(self.handle, host, port, limit=1 << 16)
+        return self.server
+
+    async def close(self):
+        for table in self.tables.values():
+            table.task.cancel()
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        client = Client(writer)
+        try:
+            while line := await reader.readline():
+                try:
+                    message = json.loads(line)
+                    if not isinstance(message, dict):
+                        raise Exception('messages must be objects')
+                    self.dispatch(client, message)
+                except Exception as e:
+                    client.send({'op': 'error', 'id': None, 'error': str(e)})
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if client.table is not None:
+                client.table.leave(client)
+            writer.close()
+
+    def remove_table(self, table: Table):
+        if self.tables.get(table.name) is table:
+            del self.tables[table.name]
+
+    def dispatch(self, client: Client, message: dict[str, Any]):
+        op = message.get('op')
+        if op == 'join':
+            if client.table is not None:
+                raise Exception('already at a table')
+            name = message.get('name')
+            table_name = message.get('table')
+            if not isinstance(name, str) or not isinstance(table_name, str):
+                raise Exception('join needs a table and a name')
+            table = self.tables.get(table_name)
+            if table is None:
+                players = message.get('players', 2)
+                if not isinstance(players, int) or not 2 <= players <= 6:
+                    raise Exception('tables have 2 to 6 players')
+                table = self.tables[table_name] = Table(table_name, players, self.rng.getrandbits(64),
+                                                        self.max_actions, self.remove_table)
+            table.join(client, name)
+        elif op == 'trigger':
+            if client.table is None:
+                raise Exception('join a table first')
+            client.table.queue.put_nowait((client, message))
+        else:
+            raise Exception(f'unknown op {op}')
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+async def play_client(host: str, port: int, table: str, name: str, players: int, rng: random.Random,
+                      latencies: list[float]) -> int:
+    """
+    Join a table and play random actions until the game ends.
+    :param latencies: seconds from sending each trigger to its reply are appended to it
+    :return: the number of rejected triggers
+    """
+    reader, writer = await asyncio.open_connection(host, port, limit=1 << 16)
+    writer.write(json.dumps({'op': 'join', 'table': table, 'name': name, 'players': players}).encode() + b'\n')
+    sent: dict[int, float] = {}
+    errors = 0
+    next_id = 0
+    try:
+        while line := await reader.readline():
+            message = json.loads(line)
+            op = message['op']
+            if op in ('ok', 'error'):
+                if message['id'] in sent:
+                    latencies.append(time.perf_counter() - sent.pop(message['id']))
+                errors += op == 'error'
+            elif op == 'update':
+                if 'winner' in message:
+                    break
+                if message['actions']:
+                    trigger, target = rng.choice(message['actions'])
+                    kwargs = {ACTION_KWARGS[trigger]: target} if target else {}
+                    next_id += 1
+                    sent[next_id] = time.perf_counter()
+                    writer.write(json.dumps({'op': 'trigger', 'id': next_id, 'trigger': trigger,
+                                             'kwargs': kwargs}).encode() + b'\n')
+                    await writer.drain()
+    finally:
+        writer.close()
+    return errors
+
+
+async def load_test(host: str, port: int, connections: int, players: int = 2, seed: int = 0) -> dict[str, float]:
+    """
+    Open connections clients, seated players to a table, and play every table to the end.
+    :return: the number of triggers, rejected triggers, p50 and p99 latency in milliseconds and triggers per second
+    """
+    rng = random.Random(seed)
+    latencies: list[float] = []
+    start = time.perf_counter()
+    clients = [play_client(host, port, f'load{i // players}', f'p{i % players}', players,
+                           random.Random(rng.getrandbits(64)), latencies)
+               for i in range(connections - connections % players)]
+    errors = sum(await asyncio.gather(*clients))
+    elapsed = time.perf_counter() - start
+    return {'triggers': len(latencies), 'errors': errors, 'p50_ms': percentile(latencies, 0.5) * 1e3,
+            'p99_ms': percentile(latencies, 0.99) * 1e3, 'triggers_per_sec': len(latencies) / elapsed}
+
+
+async def serve(host: str, port: int, seed: int | None):
+    server = await CoupServer(seed).start(host, port)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description='Host Coup tables or load test a server')
+    parser.add_argument('command', choices=['serve', 'load'])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--connections', type=int, default=1000, help='clients opened by the load test')
+    parser.add_argument('--players', type=int, default=2, help='players per table in the load test')
+    args = parser.parse_args(argv)
+    if args.command == 'serve':
+        asyncio.run(serve(args.host, args.port, args.seed))
+    else:
+        result = asyncio.run(load_test(args.host, args.port, args.connections, args.players, args.seed or 0))
+        print(', '.join(f'{key}: {value:.2f}' for key, value in result.items()))
+
+
+if __name__ == '__main__':
+    main()
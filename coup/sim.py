@@ -0,0 +1,296 @@
+"""
+Headless simulation of complete games between agents.
+Run `python -m coup.sim -n 10000 random greedy challenge` to print statistics for a line-up.
+"""
+import argparse
+import random
+import time
+from typing import TYPE_CHECKING, Iterator, Protocol, Sequence
+
+from coup.game import Action, Coup, action_kwargs
+from coup.player import Player
+from coup.states import States
+
+if TYPE_CHECKING:
+    from coup.instrument import Profile
+    from coup.log import LogWriter
+
+# Response states: the player whose claim is responded to, the trigger to challenge it and the trigger
+# used when everybody passes
+RESPONSES = {
+    States.waiting_block_foreign_aid: ('current_player', None, 'decline_block_foreign_aid'),
+    States.waiting_challenge_block_foreign_aid: ('foreign_aid_blocker', 'challenge_block_foreign_aid',
+                                                 'decline_challenge_block_foreign_aid'),
+    States.waiting_block_assassin: ('current_player', 'challenge_assassin', 'decline_block_assassin'),
+    States.waiting_challenge_block_assassin: ('assassin_target', 'challenge_block_assassin',
+                                              'decline_challenge_block_assassin'),
+    States.waiting_challenge_duke: ('current_player', 'challenge_duke', 'decline_challenge_duke'),
+    States.waiting_challenge_captain: ('current_player', 'challenge_captain', 'decline_challenge_captain'),
+    States.waiting_challenge_block_captain: ('captain_target', 'challenge_block_captain',
+                                             'decline_challenge_block_captain'),
+    States.waiting_challenge_ambassador: ('current_player', 'challenge_ambassador', 'decline_challenge_ambassador'),
+}
+
+# Stop games which don't finish, e.g. two agents trading coins with the captain forever
+MAX_ACTIONS = 1000
+
+
+class Agent(Protocol):
+    def act(self, game: Coup, player: Player, options: list[Action], rng: random.Random) -> Action:
+        """
+        Choose an action for player.
+        :param game: the game being played, agents must not trigger it themselves
+        :param player: the player the agent is acting for
+        :param options: the actions available to player, responses include the decline action to pass
+        :param rng: random source for the game, agents should not use the global random module
+        :return: one of options
+        """
+        ...
+
+
+def turn_options(game: Coup) -> list[Action]:
+    """
+    :return: the actions available to the current player in player_turn
+    """
+    return list(game.legal_actions())
+
+
+def response_options(game: Coup, player: Player) -> list[Action]:
+    """
+    :return: the responses available to player in the current state, not including passing
+    """
+    state = game.state
+    if state is States.waiting_block_foreign_aid:
+        return [('block_foreign_aid', player.name)]
+    if state is States.waiting_challenge_block_foreign_aid:
+        # Only the player who asked for foreign aid can challenge the block
+        return [('challenge_block_foreign_aid', None)] if player is game.current_player else []
+    options: list[Action] = [(RESPONSES[state][1], player.name)]
+    if state is States.waiting_block_assassin and player is game.assassin_target:
+        options.append(('block_assassin', None))
+    elif state is States.waiting_challenge_captain and player is game.captain_target:
+        options.append(('block_captain', None))
+    return options
+
+
+def next_action(game: Coup, agents: Sequence[Agent], seats: dict[str, int], rng: random.Random) -> Action:
+    """
+    Ask the agents for the next action in game.
+    In response states every other player is asked in turn order, the first one not passing acts.
+    :param seats: maps player names to their agent's index
+    :return: the action to trigger
+    """
+    state = game.state
+    if state is States.player_turn:
+        player = game.current_player
+        return agents[seats[player.name]].act(game, player, turn_options(game), rng)
+    if state is States.ambassador_trade:
+        return 'resolve_ambassador_trade', None
+
+    claimant, _, decline = RESPONSES[state]
+    claimant = getattr(game, claimant)
+    decline_action: Action = (decline, None)
+    players = game.players
+    for i in range(len(players)):
+        seat = (game.player_index + i) % len(players)
+        player = players[seat]
+        if not game.alive >> seat & 1 or player is claimant:
+            continue
+        options = response_options(game, player)
+        if not options:
+            continue
+        options.append(decline_action)
+        action = agents[seats[player.name]].act(game, player, options, rng)
+        if action != decline_action:
+            return action
+    return decline_action
+
+
+class SimStats:
+    """
+    Aggregate statistics over a set of games.
+    """
+
+    def __init__(self, seats: int):
+        self.games = 0
+        self.wins = [0] * seats
+        self.unfinished = 0
+        self.total_actions = 0
+        self.longest = 0
+        self.action_counts: dict[str, int] = {}
+        self.elapsed = 0.0
+
+    def add_game(self, winner: int | None, actions: int):
+        self.games += 1
+        if winner is None:
+            self.unfinished += 1
+        else:
+            self.wins[winner] += 1
+        self.total_actions += actions
+        self.longest = max(self.longest, actions)
+
+    def merge(self, other: 'SimStats'):
+        self.games += other.games
+        self.wins = [a + b for a, b in zip(self.wins, other.wins)]
+        self.unfinished += other.unfinished
+        self.total_actions += other.total_actions
+        self.longest = max(self.longest, other.longest)
+        for trigger, count in other.action_counts.items():
+            self.action_counts[trigger] = self.action_counts.get(trigger, 0) + count
+        self.elapsed += other.elapsed
+
+    @property
+    def win_rates(self) -> list[float]:
+        return [wins / self.games if self.games else 0.0 for wins in self.wins]
+
+    @property
+    def mean_length(self) -> float:
+        return self.total_actions / self.games if self.games else 0.0
+
+    @property
+    def games_per_sec(self) -> float:
+        return self.games / self.elapsed if self.elapsed else 0.0
+
+    def __repr__(self):
+        rates = ', '.join(f'{rate:.3f}' for rate in self.win_rates)
+        actions = ', '.join(f'{trigger}: {count}' for trigger, count in
+                            sorted(self.action_counts.items(), key=lambda item: -item[1]))
+        return (f'{self.games} games ({self.unfinished} unfinished) at {self.games_per_sec:.0f} games/sec\n'
+                f'win rates: [{rates}]\n'
+                f'mean length: {self.mean_length:.1f} actions, longest: {self.longest}\n'
+                f'actions: {actions}')
+
+
+def seeded_game(n_players: int, rng: random.Random, game_cls: type[Coup] = Coup) -> Coup:
+    """
+    :return Coup: a new game between players p0, p1, ... seeded from rng
+    """
+    return game_cls([Player(f'p{seat}') for seat in range(n_players)], seed=rng.getrandbits(64))
+
+
+def play_game(agents: Sequence[Agent], rng: random.Random, action_counts: dict[str, int] | None = None,
+              max_actions: int = MAX_ACTIONS, log: 'LogWriter | None' = None,
+              game_cls: type[Coup] = Coup) -> tuple[int | None, int]:
+    """
+    Play one game to the end.
+    :param agents: one agent per seat, seat 0 moves first
+    :param rng: random source for the agents and the game's seed
+    :param action_counts: if provided, counts of each trigger are added to it
+    :param max_actions: the game is abandoned after this many actions
+    :param log: if provided, the game is written to it
+    :param game_cls: the class of the game, e.g. an instrumented one from coup.instrument
+    :return: the winning seat (None if the game did not finish) and the number of actions taken
+    """
+    game = seeded_game(len(agents), rng, game_cls)
+    seats = {player.name: seat for seat, player in enumerate(game.players)}
+    actions = 0
+    while game.state is not States.game_over and actions < max_actions:
+        action = next_action(game, agents, seats, rng)
+        game.trigger(action[0], **action_kwargs(action))
+        actions += 1
+        if action_counts is not None:
+            action_counts[action[0]] = action_counts.get(action[0], 0) + 1
+    if log is not None:
+        log.write_game(game)
+    if game.state is not States.game_over:
+        return None, actions
+    return game.alive.bit_length() - 1, actions
+
+
+def run_games(n: int, agents: Sequence[Agent], seed: int | None = None, max_actions: int = MAX_ACTIONS,
+              log: 'LogWriter | None' = None, profile: 'Profile | None' = None) -> SimStats:
+    """
+    Play n games between the same line-up.
+    :param n: number of games
+    :param agents: one agent per seat
+    :param seed: seed for the whole run, the same seed and agents always play the same games
+    :param log: if provided, every game is written to it
+    :param profile: if provided, trigger and callback timings are recorded into it
+    :return SimStats: statistics over the games
+    """
+    game_cls = Coup
+    if profile is not None:
+        from coup.instrument import instrument
+        game_cls = instrument(profile)
+    rng = random.Random(seed)
+    stats = SimStats(len(agents))
+    start = time.perf_counter()
+    for _ in range(n):
+        stats.add_game(*play_game(agents, rng, stats.action_counts, max_actions, log, game_cls))
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+class RandomAgent:
+    """
+    Picks uniformly from its options.
+    """
+
+    def act(self, game: Coup, player: Player, options: list[Action], rng: random.Random) -> Action:
+        return rng.choice(options)
+
+
+class GreedyCoinsAgent:
+    """
+    Coups whenever it can and otherwise takes the action claiming the most coins, never responds.
+    """
+    preference = ('coup', 'duke', 'captain', 'foreign_aid', 'income')
+
+    def act(self, game: Coup, player: Player, options: list[Action], rng: random.Random) -> Action:
+        for trigger in self.preference:
+            choices = [option for option in options if option[0] == trigger]
+            if choices:
+                if trigger == 'captain':
+                    # Steal from the richest player
+                    return max(choices, key=lambda option: game.get_player(option[1]).coins)
+                return rng.choice(choices)
+        return options[-1]
+
+
+class AlwaysChallengeAgent:
+    """
+    Challenges every claim it can, otherwise plays randomly.
+    """
+
+    def act(self, game: Coup, player: Player, options: list[Action], rng: random.Random) -> Action:
+        for option in options:
+            if option[0].startswith('challenge_'):
+                return option
+        return rng.choice(options)
+
+
+AGENTS = {'random': RandomAgent, 'greedy': GreedyCoinsAgent, 'challenge': AlwaysChallengeAgent}
+
+
+def random_turns(game: Coup, rng: random.Random) -> Iterator[Action]:
+    """
+    Play game to the end with a RandomAgent in every seat.
+    :return: each action, yielded once it has been triggered
+    """
+    agents = [RandomAgent()] * len(game.players)
+    seats = {player.name: seat for seat, player in enumerate(game.players)}
+    while game.state is not States.game_over:
+        action = next_action(game, agents, seats, rng)
+        game.trigger(action[0], **action_kwargs(action))
+        yield action
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description='Simulate Coup games between agents')
+    parser.add_argument('agents', nargs='+', choices=sorted(AGENTS))
+    parser.add_argument('-n', type=int, default=1000, help='number of games')
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--profile', choices=['text', 'json', 'prometheus'], default=None,
+                        help='time triggers and callbacks and print them in this format')
+    args = parser.parse_args(argv)
+    profile = None
+    if args.profile:
+        from coup.instrument import Profile
+        profile = Profile()
+    print(run_games(args.n, [AGENTS[name]() for name in args.agents], args.seed, profile=profile))
+    if profile is not None:
+        print({'text': repr, 'json': Profile.to_json, 'prometheus': Profile.to_prometheus}[args.profile](profile))
+
+
+if __name__ == '__main__':
+    main()
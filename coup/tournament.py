@@ -0,0 +1,183 @@
+"""
+Tournaments between agent line-ups, played across a process pool.
+Run `python -m coup.tournament -n 100000 --seed 1 random,greedy greedy,challenge,random` to compare line-ups.
+"""
+import argparse
+import itertools
+import os
+import random
+import time
+from array import array
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, wait
+from typing import Iterator, Sequence
+
+from coup.game import TRANSITIONS
+from coup.sim import AGENTS, MAX_ACTIONS, SimStats, play_game
+
+# Agents are referenced by their name in coup.sim.AGENTS so shards pickle to a few bytes
+Lineup = tuple[str, ...]
+# Shard index, line-up index, seat permutation, number of games and seed
+Shard = tuple[int, int, tuple[int, ...], int, int]
+
+TRIGGERS = list(dict.fromkeys(transition['trigger'] for transition in TRANSITIONS))
+
+SHARD_SIZE = 500
+
+
+def shard_seed(seed: int, index: int) -> int:
+    """
+    :return int: the seed for a shard, it only depends on the master seed and the shard's index
+    """
+    return random.Random(f'{seed}/{index}').getrandbits(64)
+
+
+def make_shards(lineups: Sequence[Lineup], games: int, seed: int, shard_size: int = SHARD_SIZE) -> Iterator[Shard]:
+    """
+    Split a tournament into shards.
+    Each line-up plays games games spread evenly over every distinct seat permutation.
+    :param lineups: the line-ups to play
+    :param games: number of games per line-up
+    :param seed: master seed
+    :param shard_size: maximum number of games in one shard
+    """
+    index = 0
+    for lineup_index, lineup in enumerate(lineups):
+        perms = sorted(set(itertools.permutations(range(len(lineup)))))
+        for perm_index, perm in enumerate(perms):
+            n = games // len(perms) + (perm_index < games % len(perms))
+            for start in range(0, n, shard_size):
+                yield index, lineup_index, perm, min(shard_size, n - start), shard_seed(seed, index)
+                index += 1
+
+
+def play_shard(lineup: Lineup, shard: Shard, max_actions: int = MAX_ACTIONS) -> tuple[int, bytes, list[int]]:
+    """
+    Play the games of a shard, this runs in the worker processes.
+    :return: the shard index, a record per game and the trigger counts in TRIGGERS order. Each record is the
+    winning position in the line-up (-1 if unfinished) followed by the number of actions, as signed 16 bit ints.
+    """
+    index, _, perm, n, seed = shard
+    # Seat i is played by lineup[perm[i]]
+    agents = [AGENTS[lineup[position]]() for position in perm]
+    rng = random.Random(seed)
+    counts: dict[str, int] = {}
+    records = array('h')
+    for _ in range(n):
+        winner, actions = play_game(agents, rng, counts, max_actions)
+        records.append(-1 if winner is None else perm[winner])
+        records.append(min(actions, 0x7fff))
+    return index, records.tobytes(), [counts.get(trigger, 0) for trigger in TRIGGERS]
+
+
+def _play_shard(args: tuple[Lineup, Shard, int]) -> tuple[int, bytes, list[int]]:
+    return play_shard(*args)
+
+
+class TournamentResult:
+    """
+    Statistics of every line-up in a tournament, wins are counted per position in the line-up.
+    """
+
+    def __init__(self, lineups: Sequence[Lineup]):
+        self.lineups = list(lineups)
+        self.stats = [SimStats(len(lineup)) for lineup in lineups]
+        self.elapsed = 0.0
+
+    def add_shard(self, lineup_index: int, records: bytes, counts: list[int]):
+        stats = self.stats[lineup_index]
+        values = array('h')
+        values.frombytes(records)
+        for i in range(0, len(values), 2):
+            winner = values[i]
+            stats.add_game(None if winner < 0 else winner, values[i + 1])
+        for trigger, count in zip(TRIGGERS, counts):
+            if count:
+                stats.action_counts[trigger] = stats.action_counts.get(trigger, 0) + count
+
+    @property
+    def games(self) -> int:
+        return sum(stats.games for stats in self.stats)
+
+    @property
+    def games_per_sec(self) -> float:
+        return self.games / self.elapsed if self.elapsed else 0.0
+
+    def __eq__(self, other):
+        # Timing is the only thing allowed to differ between runs with the same seed
+        return isinstance(other, TournamentResult) and self.lineups == other.lineups and all(
+            a.games == b.games and a.wins == b.wins and a.unfinished == b.unfinished and
+            a.total_actions == b.total_actions and a.longest == b.longest and a.action_counts == b.action_counts
+            for a, b in zip(self.stats, other.stats))
+
+    def __repr__(self):
+        lines = [f'{self.games} games at {self.games_per_sec:.0f} games/sec']
+        for lineup, stats in zip(self.lineups, self.stats):
+            rates = ', '.join(f'{name}: {rate:.3f}' for name, rate in zip(lineup, stats.win_rates))
+            lines.append(f'[{rates}] mean length {stats.mean_length:.1f}, {stats.unfinished} unfinished')
+        return '\n'.join(lines)
+
+
+def run_tournament(lineups: Sequence[Lineup], games: int, seed: int = 0, workers: int | None = None,
+                   shard_size: int = SHARD_SIZE, executor: Executor | None = None) -> TournamentResult:
+    """
+    Play a tournament, the result only depends on the line-ups, games, seed and shard size.
+    :param lineups: line-ups of 2 to 6 agent names from coup.sim.AGENTS
+    :param games: number of games per line-up
+    :param seed: master seed
+    :param workers: number of worker processes, defaults to the number of cores. 0 plays in this process.
+    :param shard_size: maximum number of games per shard
+    :param executor: an executor to use instead of starting a process pool
+    :return TournamentResult: merged statistics
+    """
+    lineups = [tuple(lineup) for lineup in lineups]
+    for lineup in lineups:
+        if not 2 <= len(lineup) <= 6:
+            raise Exception('line-ups must have 2 to 6 players')
+        for name in lineup:
+            if name not in AGENTS:
+                raise Exception(f'unknown agent {name}')
+
+    result = TournamentResult(lineups)
+    start = time.perf_counter()
+    shards = make_shards(lineups, games, seed, shard_size)
+    if workers == 0 and executor is None:
+        for shard in shards:
+            _, records, counts = play_shard(lineups[shard[1]], shard)
+            result.add_shard(shard[1], records, counts)
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    workers = workers or os.cpu_count() or 1
+    pool = executor or ProcessPoolExecutor(workers)
+    try:
+        # Only keep a few shards per worker in flight so memory doesn't grow with the number of games
+        pending = {}
+        for shard in shards:
+            pending[pool.submit(_play_shard, (lineups[shard[1]], shard, MAX_ACTIONS))] = shard[1]
+            if len(pending) >= workers * 4:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    _, records, counts = future.result()
+                    result.add_shard(pending.pop(future), records, counts)
+        for future in list(pending):
+            _, records, counts = future.result()
+            result.add_shard(pending.pop(future), records, counts)
+    finally:
+        if executor is None:
+            pool.shutdown()
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description='Play a tournament between line-ups of agents')
+    parser.add_argument('lineups', nargs='+', help=f'comma separated agents from {", ".join(sorted(AGENTS))}')
+    parser.add_argument('-n', type=int, default=10000, help='number of games per line-up')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+    print(run_tournament([lineup.split(',') for lineup in args.lineups], args.n, args.seed, args.workers))
+
+
+if __name__ == '__main__':
+    main()
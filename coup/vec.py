@@ -0,0 +1,411 @@
+"""
+A NumPy engine stepping many games in lockstep, with the same rules as the Coup state machine.
+Games are rows of arrays, actions are indices into action_space(n_players).
+"""
+import numpy as np
+
+from coup.deck import CARDS_PER_TYPE, card_codes, card_types
+from coup.game import (ACTION_KWARGS, CHALLENGED, FORCE_COUP_GUARDED, INTERNAL_TRIGGERS, STATE_TRIGGERS, TRANSITIONS, Coup)
+from coup.states import States
+
+STATES = list(States)
+STATE_CODES = {state: code for code, state in enumerate(STATES)}
+PLAYER_TURN = STATE_CODES[States.player_turn]
+GAME_OVER = STATE_CODES[States.game_over]
+TRIGGERS = [trigger for trigger in dict.fromkeys(transition['trigger'] for transition in TRANSITIONS)
+            if trigger not in INTERNAL_TRIGGERS]
+TRIGGER_CODES = {trigger: code for code, trigger in enumerate(TRIGGERS)}
+DEST = {transition['trigger']: STATE_CODES[transition['dest']] for transition in TRANSITIONS}
+DECK_SIZE = len(card_types) * CARDS_PER_TYPE
+HAND_SIZE = 2
+NONE = -1
+CHALLENGE_SOURCES = ('current_player', 'assassin_target', 'captain_target')
+
+
+def action_space(n_players: int) -> list[tuple[str, int | None]]:
+    """
+    :return: every (trigger, seat) action, parameterized triggers take every seat
+    """
+    actions: list[tuple[str, int | None]] = []
+    for trigger in TRIGGERS:
+        if trigger in ACTION_KWARGS:
+            actions.extend((trigger, seat) for seat in range(n_players))
+        else:
+            actions.append((trigger, None))
+    return actions
+
+
+class VecCoup:
+    """
+    n games of n_players each. Every array has the game as its first axis:
+        coins (n, players), hand (n, players, 2) card codes with -1 for an empty slot, face_up (n, players, 2),
+        deck (n, 15) with the top of the deck at deck_len - 1, alive (n, players), current (n,) seat,
+        phase (n,) index into States, assassin_target, captain_target and blocker (n,) seats or -1.
+    Hands keep the order of Player.cards, since that decides which card is lost.
+    """
+
+    def __init__(self, n: int, n_players: int, seed: int | None = None):
+        if not 2 <= n_players <= 6:
+            raise Exception('games need 2 to 6 players')
+        self.n = n
+        self.n_players = n_players
+        self.rng = np.random.default_rng(seed)
+        self.actions = action_space(n_players)
+        self.n_actions = len(self.actions)
+        self.action_trigger = np.array([TRIGGER_CODES[trigger] for trigger, _ in self.actions], dtype=np.int8)
+        self.action_seat = np.array([NONE if seat is None else seat for _, seat in self.actions], dtype=np.int8)
+
+        # Which actions each state allows before looking at coins and players
+        self.state_actions = np.zeros((len(STATES), self.n_actions), dtype=bool)
+        for state, triggers in STATE_TRIGGERS.items():
+            for i, (trigger, _) in enumerate(self.actions):
+                self.state_actions[STATE_CODES[state], i] = trigger in triggers
+        self.guarded = np.array([trigger in FORCE_COUP_GUARDED for trigger, _ in self.actions])
+        self.is_coup = np.array([trigger == 'coup' for trigger, _ in self.actions])
+        self.is_assassin = np.array([trigger == 'assassin' for trigger, _ in self.actions])
+        self.is_challenge = np.array([ACTION_KWARGS.get(trigger) == 'challenger' for trigger, _ in self.actions])
+        # Which of the current player, the assassin target and the captain target each challenge is against
+        self.challenged = np.array([CHALLENGE_SOURCES.index(CHALLENGED[trigger]) if trigger in CHALLENGED else 0
+                                    for trigger, _ in self.actions])
+        self.is_targeted = np.array([trigger in ACTION_KWARGS and ACTION_KWARGS[trigger] != 'challenger'
+                                     for trigger, _ in self.actions])
+        self.param_seat = np.where(self.action_seat >= 0, self.action_seat, 0)
+
+        self.coins = np.zeros((n, n_players), dtype=np.int16)
+        self.hand = np.full((n, n_players, HAND_SIZE), NONE, dtype=np.int8)
+        self.face_up = np.zeros((n, n_players, HAND_SIZE), dtype=bool)
+        self.deck = np.full((n, DECK_SIZE), NONE, dtype=np.int8)
+        self.deck_len = np.zeros(n, dtype=np.int16)
+        self.alive = np.zeros((n, n_players), dtype=bool)
+        self.current = np.zeros(n, dtype=np.int8)
+        self.phase = np.zeros(n, dtype=np.int8)
+        self.assassin_target = np.full(n, NONE, dtype=np.int8)
+        self.captain_target = np.full(n, NONE, dtype=np.int8)
+        self.blocker = np.full(n, NONE, dtype=np.int8)
+        self.reset()
+
+    def reset(self, games: np.ndarray | None = None):
+        """
+        Deal new games.
+        :param games: indices of the games to reset, all of them by default
+        """
+        games = np.arange(self.n) if games is None else np.asarray(games)
+        k = len(games)
+        cards = np.repeat(np.arange(len(card_types), dtype=np.int8), CARDS_PER_TYPE)
+        order = np.argsort(self.rng.random((k, DECK_SIZE)), axis=1)
+        deck = cards[order]
+        # Coup deals from the top of the deck, two cards to each player in turn
+        top = DECK_SIZE - 1 - np.arange(self.n_players * HAND_SIZE)
+        self.hand[games] = deck[:, top].reshape(k, self.n_players, HAND_SIZE)
+        deck[:, DECK_SIZE - self.n_players * HAND_SIZE:] = NONE
+        self.deck[games] = deck
+        self.deck_len[games] = DECK_SIZE - self.n_players * HAND_SIZE
+        self.face_up[games] = False
+        self.coins[games] = 2
+        self.alive[games] = True
+        self.current[games] = 0
+        self.phase[games] = PLAYER_TURN
+        self.assassin_target[games] = NONE
+        self.captain_target[games] = NONE
+        self.blocker[games] = NONE
+
+    @classmethod
+    def from_games(cls, games: list[Coup]) -> 'VecCoup':
+        """
+        Copy the positions of Coup games, every game needs the same number of players each holding 2 cards.
+        """
+        v = cls(len(games), len(games[0].players))
+        for i, game in enumerate(games):
+            v.set_game(i, game)
+        return v
+
+    def set_game(self, i: int, game: Coup):
+        if len(game.players) != self.n_players:
+            raise Exception(f'expected {self.n_players} players')
+        self.hand[i] = NONE
+        self.face_up[i] = False
+        for seat, player in enumerate(game.players):
+            if len(player.cards) != HAND_SIZE:
+                raise Exception('every player must hold 2 cards')
+            self.coins[i, seat] = player.coins
+            for slot, card in enumerate(player.cards):
+                self.hand[i, seat, slot] = card.code
+                self.face_up[i, seat, slot] = card.face_up
+            self.alive[i, seat] = bool(game.alive >> seat & 1)
+        self.deck[i] = NONE
+        self.deck[i, :len(game.deck.codes)] = np.frombuffer(bytes(game.deck.codes), dtype=np.int8)
+        self.deck_len[i] = len(game.deck.codes)
+        self.current[i] = game.player_index
+        self.phase[i] = STATE_CODES[game.state]
+        for name in ('assassin_target', 'captain_target'):
+            seat = game.seat_of(getattr(game, name))
+            getattr(self, name)[i] = NONE if seat is None else seat
+        seat = game.seat_of(game.foreign_aid_blocker)
+        self.blocker[i] = NONE if seat is None else seat
+
+    def state(self) -> dict[str, np.ndarray]:
+        """
+        :return: copies of every state array, for comparing engines
+        """
+        return {name: getattr(self, name).copy() for name in
+                ('coins', 'hand', 'face_up', 'deck', 'deck_len', 'alive', 'current', 'phase', 'assassin_target',
+                 'captain_target', 'blocker')}
+
+    @property
+    def done(self) -> np.ndarray:
+        return self.phase == GAME_OVER
+
+    def winner(self) -> np.ndarray:
+        """
+        :return: the winning seat of each finished game, -1 for games still running
+        """
+        return np.where(self.done, np.argmax(self.alive, axis=1), NONE)
+
+    def legal_mask(self) -> np.ndarray:
+        """
+        :return: (n, n_actions) bool, the same actions as Coup.legal_actions
+        """
+        rows = np.arange(self.n)
+        coins = self.coins[rows, self.current][:, None]
+        mask = self.state_actions[self.phase]
+        mask &= ~(self.guarded & (coins >= 10))
+        mask &= ~(self.is_coup & (coins < 7))
+        mask &= ~(self.is_assassin & (coins < 3))
+        seat_alive = self.alive[:, self.param_seat]
+        challenged = np.stack([self.current, self.assassin_target, self.captain_target], axis=1)[:, self.challenged]
+        mask &= ~(self.is_challenge & (~seat_alive | (self.param_seat == challenged)))
+        mask &= ~(self.is_targeted & (~seat_alive | (self.param_seat == self.current[:, None])))
+        return mask
+
+    def observe(self, seats: np.ndarray | None = None, out: np.ndarray | None = None) -> np.ndarray:
+        """
+        Observation of each game from one seat's view: the phase, the current seat and pending targets one-hot,
+        coins, living players, every player's face up cards, the viewer's face down cards and the deck size.
+        :param seats: the viewing seat of each game, the current player by default
+        :param out: an array to write into instead of allocating one
+        :return: (n, observation_size) float32
+        """
+        seats = self.current if seats is None else seats
+        p = self.n_players
+        out = np.zeros((self.n, self.observation_size), dtype=np.float32) if out is None else out
+        out[:] = 0
+        rows = np.arange(self.n)
+        offset = 0
+        out[rows, offset + self.phase] = 1
+        offset += len(STATES)
+        out[rows, offset + self.current] = 1
+        offset += p
+        for target in (self.assassin_target, self.captain_target, self.blocker):
+            has = target >= 0
+            out[rows[has], offset + target[has]] = 1
+            offset += p
+        out[:, offset:offset + p] = self.coins / 12
+        offset += p
+        out[:, offset:offset + p] = self.alive
+        offset += p
+        up = self.face_up & (self.hand >= 0)
+        for code in range(len(card_types)):
+            out[:, offset + code * p:offset + (code + 1) * p] = ((self.hand == code) & up).sum(axis=2)
+        offset += len(card_types) * p
+        own = self.hand[rows, seats]
+        own_down = ~self.face_up[rows, seats] & (own >= 0)
+        for code in range(len(card_types)):
+            out[:, offset + code] = ((own == code) & own_down).sum(axis=1)
+        offset += len(card_types)
+        out[:, offset] = self.deck_len / DECK_SIZE
+        return out
+
+    @property
+    def observation_size(self) -> int:
+        return len(STATES) + 6 * self.n_players + len(card_types) * self.n_players + len(card_types) + 1
+
+    def step(self, actions: np.ndarray, u: np.ndarray | None = None) -> np.ndarray:
+        """
+        Take one action in every game, finished games ignore their action.
+        :param actions: (n,) indices into self.actions, each must be legal
+        :param u: (n,) uniform numbers in [0, 1) placing cards returned to the deck, as Deck.return_to_deck does
+        :return: the done mask
+        """
+        actions = np.asarray(actions)
+        running = ~self.done
+        rows = np.arange(self.n)
+        if not self.legal_mask()[rows[running], actions[running]].all():
+            raise Exception('illegal action')
+        u = self.rng.random(self.n) if u is None else np.asarray(u)
+        trigger = self.action_trigger[actions]
+        seat = self.action_seat[actions]
+
+        for code, name in enumerate(TRIGGERS):
+            games = np.nonzero(running & (trigger == code))[0]
+            if len(games):
+                getattr(self, '_' + name)(games, seat[games].astype(np.intp), u)
+                self.phase[games] = DEST[name]
+        entering = np.nonzero(running & (self.phase == PLAYER_TURN))[0]
+        self._next_turn(entering)
+        return self.done
+
+    # Card operations, games is an index array and seats an array of the same length
+
+    def _lose_influence(self, games: np.ndarray, seats: np.ndarray):
+        down = (self.hand[games, seats] >= 0) & ~self.face_up[games, seats]
+        has = down.any(axis=1)
+        first = np.argmax(down, axis=1)
+        self.face_up[games[has], seats[has], first[has]] = True
+        down[has, first[has]] = False
+        self.alive[games, seats] &= down.any(axis=1)
+
+    def _show(self, games: np.ndarray, seats: np.ndarray, code: int) -> np.ndarray:
+        """
+        Remove the first card of each player matching code, the other card moves to the first slot.
+        :return: mask of the players who had the card
+        """
+        match = self.hand[games, seats] == code
+        found = match.any(axis=1)
+        g, s = games[found], seats[found]
+        other = 1 - np.argmax(match[found], axis=1)
+        other_card = self.hand[g, s, other]
+        other_up = self.face_up[g, s, other]
+        self.hand[g, s, 0] = other_card
+        self.face_up[g, s, 0] = other_up
+        self.hand[g, s, 1] = NONE
+        self.face_up[g, s, 1] = False
+        return found
+
+    def _exchange(self, games: np.ndarray, seats: np.ndarray, code: int, u: np.ndarray):
+        # Return the card to a random position, then draw the top card into the empty slot
+        end = self.deck_len[games].astype(np.intp)
+        self.deck[games, end] = code
+        j = (u[games] * (end + 1)).astype(np.intp)
+        swapped = self.deck[games, j]
+        self.deck[games, j] = code
+        self.deck[games, end] = NONE
+        self.hand[games, seats, 1] = swapped
+        self.face_up[games, seats, 1] = False
+
+    def _resolve_challenge(self, games: np.ndarray, challenged: np.ndarray, challengers: np.ndarray, card: str,
+                           u: np.ndarray, callback=None):
+        code = card_codes[card]
+        shown = self._show(games, challenged, code)
+        won = games[shown]
+        self._lose_influence(won, challengers[shown])
+        self._exchange(won, challenged[shown], code, u)
+        if callback is not None:
+            callback(won)
+        self._lose_influence(games[~shown], challenged[~shown])
+
+    def _next_turn(self, games: np.ndarray):
+        self.assassin_target[games] = NONE
+        self.captain_target[games] = NONE
+        self.blocker[games] = NONE
+        over = self.alive[games].sum(axis=1) <= 1
+        self.phase[games[over]] = GAME_OVER
+        games = games[~over]
+        order = (self.current[games, None].astype(np.intp) + np.arange(1, self.n_players + 1)) % self.n_players
+        k = np.argmax(self.alive[games[:, None], order], axis=1)
+        self.current[games] = order[np.arange(len(games)), k]
+
+    def _current(self, games: np.ndarray) -> np.ndarray:
+        return self.current[games].astype(np.intp)
+
+    def _add_coins(self, games: np.ndarray, coins: int):
+        self.coins[games, self._current(games)] += coins
+
+    def _do_captain(self, games: np.ndarray):
+        targets = self.captain_target[games].astype(np.intp)
+        stolen = np.minimum(self.coins[games, targets], 2)
+        self.coins[games, targets] -= stolen
+        self.coins[games, self._current(games)] += stolen
+
+    # One method per trigger, named after it
+
+    def _income(self, games, seats, u):
+        self._add_coins(games, 1)
+
+    def _coup(self, games, seats, u):
+        self._add_coins(games, -7)
+        self._lose_influence(games, seats)
+
+    def _foreign_aid(self, games, seats, u):
+        pass
+
+    def _decline_block_foreign_aid(self, games, seats, u):
+        self._add_coins(games, 2)
+
+    def _block_foreign_aid(self, games, seats, u):
+        self.blocker[games] = seats
+
+    def _challenge_block_foreign_aid(self, games, seats, u):
+        blockers = self.blocker[games].astype(np.intp)
+        code = card_codes['duke']
+        shown = self._show(games, blockers, code)
+        won = games[shown]
+        self._lose_influence(won, self._current(won))
+        self._exchange(won, blockers[shown], code, u)
+        lost = games[~shown]
+        self._lose_influence(lost, blockers[~shown])
+        self._add_coins(lost, 2)
+
+    def _decline_challenge_block_foreign_aid(self, games, seats, u):
+        pass
+
+    def _assassin(self, games, seats, u):
+        self.assassin_target[games] = seats
+
+    def _challenge_assassin(self, games, seats, u):
+        self._resolve_challenge(games, self._current(games), seats, 'assassin', u)
+
+    def _block_assassin(self, games, seats, u):
+        pass
+
+    def _decline_block_assassin(self, games, seats, u):
+        self._lose_influence(games, self.assassin_target[games].astype(np.intp))
+
+    def _challenge_block_assassin(self, games, seats, u):
+        self._resolve_challenge(games, self.assassin_target[games].astype(np.intp), seats, 'contessa', u)
+
+    def _decline_challenge_block_assassin(self, games, seats, u):
+        pass
+
+    def _duke(self, games, seats, u):
+        pass
+
+    def _decline_challenge_duke(self, games, seats, u):
+        self._add_coins(games, 3)
+
+    def _challenge_duke(self, games, seats, u):
+        self._resolve_challenge(games, self._current(games), seats, 'duke', u, lambda won: self._add_coins(won, 3))
+
+    def _captain(self, games, seats, u):
+        self.captain_target[games] = seats
+
+    def _decline_block_captain(self, games, seats, u):
+        self._do_captain(games)
+
+    def _block_captain(self, games, seats, u):
+        pass
+
+    def _challenge_block_captain(self, games, seats, u):
+        self._resolve_challenge(games, self.captain_target[games].astype(np.intp), seats, 'captain', u,
+                                self._do_captain)
+
+    def _decline_challenge_block_captain(self, games, seats, u):
+        pass
+
+    def _decline_challenge_captain(self, games, seats, u):
+        self._do_captain(games)
+
+    def _challenge_captain(self, games, seats, u):
+        self._resolve_challenge(games, self._current(games), seats, 'captain', u, self._do_captain)
+
+    def _ambassador(self, games, seats, u):
+        pass
+
+    def _challenge_ambassador(self, games, seats, u):
+        # The trade the challenged player wins is immediately left again for player_turn, as in Coup
+        self._resolve_challenge(games, self._current(games), seats, 'ambassador', u)
+
+    def _decline_challenge_ambassador(self, games, seats, u):
+        pass
+
+    def _resolve_ambassador_trade(self, games, seats, u):
+        pass
@@ -0,0 +1,232 @@
+"""
+Canonical position hashes and a position cache shared between agents and evaluators.
+
+A position is hashed Zobrist style, as the xor of a random 64 bit key for each of its parts: the state, the
+player_index, every seat's coins, every seat's cards by slot and whether they're face up, and the seats of the pending
+targets. Keys are taken from seats rather than names, so renaming the players doesn't change the hash, and the order
+of the deck isn't part of it. A ZobristHash attached to a game updates only the parts a trigger changed.
+"""
+from collections import OrderedDict
+from functools import cache
+from typing import Any, Callable
+
+from coup.deck import Card, card_types
+from coup.game import Coup
+from coup.player import Player
+from coup.states import States
+
+MASK = (1 << 64) - 1
+# Stands in for the code of a face down card in the keys of the information a player has
+HIDDEN = len(card_types)
+STATE, INDEX, TARGET, COINS, CARD, VIEWER = range(6)
+TARGETS = ('assassin_target', 'captain_target', 'foreign_aid_blocker')
+
+
+def _mix(x: int) -> int:
+    # splitmix64
+    x = (x + 0x9E3779B97F4A7C15) & MASK
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK
+    return x ^ (x >> 31)
+
+
+@cache
+def key(*parts: int) -> int:
+    """
+    :return int: the random key of a part of a position, the same in every process
+    """
+    x = 0
+    for part in parts:
+        x = _mix(x ^ (part + 2))
+    return x
+
+
+STATE_KEYS = {state: key(STATE, i) for i, state in enumerate(States)}
+
+
+def _targets(game: Coup) -> tuple[int | None, ...]:
+    return tuple(game.seat_of(getattr(game, name)) for name in TARGETS)
+
+
+def _target_key(targets: tuple[int | None, ...]) -> int:
+    h = 0
+    for i, seat in enumerate(targets):
+        if seat is not None:
+            h ^= key(TARGET, i, seat)
+    return h
+
+
+def _hand_keys(seat: int, cards: list[Card]) -> tuple[int, int]:
+    # Keys of what every player sees of a hand, and what only its owner sees
+    public = private = 0
+    for slot, card in enumerate(cards):
+        if card.face_up:
+            public ^= key(CARD, seat, slot, card.code, 1)
+        else:
+            hidden = key(CARD, seat, slot, HIDDEN, 0)
+            public ^= hidden
+            private ^= hidden ^ key(CARD, seat, slot, card.code, 0)
+    return public, private
+
+
+def position_hash(game: Coup) -> int:
+    """
+    Hash game from scratch.
+    :return int: the canonical hash of the position
+    """
+    return ZobristHash(game, attach=False).value
+
+
+def info_hash(game: Coup, seat: int) -> int:
+    """
+    Hash what seat knows of game from scratch.
+    :return int: the hash of the public position and seat's face down cards
+    """
+    return ZobristHash(game, attach=False).info_key(seat)
+
+
+class ZobristHash:
+    """
+    The hash of a game's position, kept up to date as an observer. Card keys are updated when a player loses influence
+    or exchanges a card, the rest is compared after each trigger.
+    """
+
+    def __init__(self, game: Coup, attach: bool = True):
+        """
+        :param attach: append to game.observers, reset must be called after the game is restored or changed outside
+            of a trigger
+        """
+        self.game = game
+        self.reset()
+        if attach:
+            game.observers.append(self)
+
+    def detach(self):
+        self.game.observers.remove(self)
+
+    def reset(self):
+        """
+        Hash the game from scratch.
+        """
+        game = self.game
+        self.state = game.state
+        self.player_index = game.player_index
+        self.targets = _targets(game)
+        self.coins = [player.coins for player in game.players]
+        self.base = STATE_KEYS[self.state] ^ key(INDEX, self.player_index) ^ _target_key(self.targets)
+        for seat, coins in enumerate(self.coins):
+            self.base ^= key(COINS, seat, coins)
+        self.public = [0] * len(game.players)
+        self.private = [0] * len(game.players)
+        self.public_total = self.private_total = 0
+        for seat in range(len(game.players)):
+            self._update_hand(seat)
+
+    @property
+    def value(self) -> int:
+        return self.base ^ self.public_total ^ self.private_total
+
+    def info_key(self, seat: int) -> int:
+        """
+        :return int: the hash of the public position and seat's face down cards
+        """
+        return self.base ^ self.public_total ^ self.private[seat] ^ key(VIEWER, seat)
+
+    def _update_hand(self, seat: int):
+        public, private = _hand_keys(seat, self.game.players[seat].cards)
+        self.public_total ^= self.public[seat] ^ public
+        self.private_total ^= self.private[seat] ^ private
+        self.public[seat] = public
+        self.private[seat] = private
+
+    def before_trigger(self, game: Coup, trigger_name: str, kwargs: dict[str, Any]):
+        pass
+
+    def after_trigger(self, game: Coup, trigger_name: str, kwargs: dict[str, Any], result: bool):
+        base = self.base
+        if game.state is not self.state:
+            base ^= STATE_KEYS[self.state] ^ STATE_KEYS[game.state]
+            self.state = game.state
+        if game.player_index != self.player_index:
+            base ^= key(INDEX, self.player_index) ^ key(INDEX, game.player_index)
+            self.player_index = game.player_index
+        targets = _targets(game)
+        if targets != self.targets:
+            base ^= _target_key(self.targets) ^ _target_key(targets)
+            self.targets = targets
+        coins = self.coins
+        for seat, player in enumerate(game.players):
+            if player.coins != coins[seat]:
+                base ^= key(COINS, seat, coins[seat]) ^ key(COINS, seat, player.coins)
+                coins[seat] = player.coins
+        self.base = base
+
+    def on_lose_influence(self, game: Coup, player: Player, card: Card | None):
+        if card is not None:
+            self._update_hand(game.seats[player.name])
+
+    def on_exchange(self, game: Coup, player: Player, card: Card):
+        self._update_hand(game.seats[player.name])
+
+
+class PositionCache:
+    """
+    Values keyed on position hashes, the least recently used are evicted past maxsize. Lookups are counted so one
+    cache can be shared by several agents and evaluators and its hit rate read afterwards.
+    """
+
+    def __init__(self, maxsize: int = 100_000):
+        self.maxsize = maxsize
+        self.entries: OrderedDict[int, Any] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, position: int) -> bool:
+        return position in self.entries
+
+    def get(self, position: int, default: Any = None) -> Any:
+        """
+        :return: the value cached for position, default if there is none
+        """
+        try:
+            value = self.entries[position]
+        except KeyError:
+            self.misses += 1
+            return default
+        self.entries.move_to_end(position)
+        self.hits += 1
+        return value
+
+    def put(self, position: int, value: Any):
+        self.entries[position] = value
+        self.entries.move_to_end(position)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def memo(self, position: int, compute: Callable[[], Any]) -> Any:
+        """
+        :return: the value cached for position, computed and cached if there is none
+        """
+        value = self.get(position, self)
+        if value is self:
+            value = compute()
+            self.put(position, value)
+        return value
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __repr__(self) -> str:
+        return f'PositionCache({len(self.entries)}/{self.maxsize} entries, {self.hits} hits, {self.misses} misses, ' \
+               f'{self.hit_rate:.1%} hit rate)'
@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from coup import *
+from coup.belief import BeliefTracker
+from coup.sim import random_turns, seeded_game
+
+
+def scanned(game: Coup, viewer: int | None) -> tuple[list[int], list[int]]:
+    unseen = [3] * len(card_types)
+    hidden = []
+    for seat, player in enumerate(game.players):
+        hidden.append(player.influence())
+        for card in player.cards:
+            if card.face_up or seat == viewer:
+                unseen[card.code] -= 1
+    return unseen, hidden
+
+
+@pytest.mark.parametrize('viewer', [None, 0])
+def test_counts_follow_game(viewer):
+    rng = random.Random(viewer)
+    for _ in range(20):
+        game = seeded_game(4, rng)
+        tracker = BeliefTracker(game, viewer)
+        for _ in random_turns(game, rng):
+            assert (tracker.unseen, tracker.hidden) == scanned(game, viewer)
+            for seat in range(4):
+                total = sum(tracker.probability(seat, code) for code in range(len(card_types)))
+                assert total == pytest.approx(1) or tracker.hidden[seat] == 0 or not any(
+                    tracker.weights[seat * 5 + code] * tracker.unseen[code] for code in range(5))
+        # Recomputing from scratch gives the same beliefs
+        again = BeliefTracker.from_history(game, viewer)
+        assert again.unseen == tracker.unseen and again.own == tracker.own
+        assert again.weights == tracker.weights
+        assert again.norms == pytest.approx(tracker.norms)
+
+
+def test_claims_and_challenges():
+    c = Coup([Player('test0', cards=[Card('duke'), Card('captain')]),
+              Player('test1', cards=[Card('contessa'), Card('assassin')])], seed=0)
+    tracker = BeliefTracker(c)
+    duke, captain = card_codes['duke'], card_codes['captain']
+    before = tracker.probability(0, duke)
+    c.trigger('duke')
+    assert tracker.probability(0, duke) > before
+    assert tracker.probability(0, captain) < before
+    # The challenge shows the duke, it goes back to the deck and the claim is forgotten
+    c.trigger('challenge_duke', challenger='test1')
+    assert tracker.probability(0, duke) == pytest.approx(tracker.unseen[duke] / sum(tracker.unseen))
+    assert tracker.hidden == [2, 1]
+
+    # test1 bluffs the captain and loses the challenge, so has no captain left
+    c.trigger('captain', target='test0')
+    c.trigger('challenge_captain', challenger='test0')
+    assert tracker.probability(1, captain) == 0
+    assert tracker.holds(1, captain) == 0
+    assert tracker.expected(0, duke) == pytest.approx(2 * tracker.probability(0, duke))
+
+
+def test_viewer_and_detach():
+    c = Coup([Player('test0', cards=[Card('duke'), Card('duke')]), Player('test1')], seed=0)
+    tracker = BeliefTracker(c, viewer=0)
+    assert tracker.probability(0, card_codes['duke']) == 1
+    assert tracker.unseen[card_codes['duke']] == 1 - sum(card.code == 0 for card in c.players[1].cards)
+    assert c.clone().observers == []
+    tracker.detach()
+    assert c.observers == []
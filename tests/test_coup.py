@@ -1,3 +1,6 @@
+import random
+import shutil
+
 import pytest
 
 from coup import __version__
@@ -157,7 +160,7 @@ def test_captain():
     assert c.get_player('test0').coins == 4
     c.trigger('captain', target='test1')
     c.trigger('block_captain')
-    c.trigger('challenge_block_captain', challenger='test1')
+    c.trigger('challenge_block_captain', challenger='test0')
     assert c.get_player('test1', active=False).influence() == 0
     assert c.get_player('test1', active=False).coins == 0
     assert c.get_player('test0').coins == 4
@@ -168,3 +171,187 @@ def test_captain():
 def test_ambassador():
     players = [Player('test0', cards=[Card('duke')]), Player('test1', cards=[Card('contessa'), Card('contessa')])]
     c = Coup(players)
+
+
+def test_no_diagram_on_construction(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Coup([Player('test0'), Player('test1')])
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.skipif(shutil.which('dot') is None, reason='graphviz is not installed')
+def test_export_diagram(tmp_path):
+    path = str(tmp_path / 'coup.png')
+    assert Coup.export_diagram(path) == path
+    mtime = (tmp_path / 'coup.png').stat().st_mtime_ns
+    Coup.export_diagram(path)
+    assert (tmp_path / 'coup.png').stat().st_mtime_ns == mtime
+
+
+def test_seeded_deck():
+    assert [card.name for card in Deck(rng=random.Random(1)).cards] == \
+           [card.name for card in Deck(rng=random.Random(1)).cards]
+    c0 = Coup([Player('test0'), Player('test1')], seed=5)
+    c1 = Coup([Player('test0'), Player('test1')], seed=5)
+    assert c0.seed == 5
+    assert [card.name for card in c0.deck.cards] == [card.name for card in c1.deck.cards]
+    assert repr(c0) == repr(c1)
+
+
+def test_replay():
+    c = Coup([Player('test0'), Player('test1')])
+    c.trigger('duke')
+    c.trigger('challenge_duke', challenger='test1')
+    c.trigger('income')
+    c.trigger('foreign_aid')
+    c.trigger('block_foreign_aid', blocker='test1')
+    c.trigger('challenge_block_foreign_aid')
+    assert len(c.history) == 6
+    replayed = Coup.replay([Player('test0'), Player('test1')], c.seed, c.history)
+    assert repr(replayed) == repr(c)
+    assert [card.name for card in replayed.deck.cards] == [card.name for card in c.deck.cards]
+    with pytest.raises(Exception):
+        Coup.replay([Player('test0', coins=7), Player('test1')], c.seed, c.history[:1] + [('coup', {}, States.player_turn)])
+
+
+def test_compact_state():
+    deck = Deck(pre_cards=[Card('duke'), Card('duke')])
+    assert isinstance(deck.codes, bytearray)
+    assert len(deck) == 13
+    assert deck.cards.count(Card('duke')) == 1
+    assert not hasattr(Card('duke'), '__dict__')
+    player = Player('test0', cards=[Card('duke'), Card('contessa')])
+    assert player.influence() == 2 and player.revealed() == 0
+    assert player.show('duke').name == 'duke'
+    assert player.influence() == 1
+    assert player.show('duke') is None
+    player.draw(deck.draw())
+    player.lose_influence('contessa')
+    assert [card.face_up for card in player.cards] == [True, False]
+    assert player.influence() == 1 and player.revealed() == 1
+    player.lose_influence()
+    assert player.is_dead()
+
+
+def test_turn_order_after_elimination():
+    c = Coup([Player('test0', cards=[Card('duke')]), Player('test1', coins=7), Player('test2'), Player('test3')])
+    c.get_player('test0').lose_influence()
+    c.trigger('income')
+    assert c.current_player.name == 'test1'
+    c.trigger('coup', target='test0')
+    assert c.get_player('test0') is None
+    assert c.get_player('test0', active=False).is_dead()
+    assert c.current_player.name == 'test2'
+    assert c.active_players == c.players[1:]
+    c.trigger('income')
+    c.trigger('income')
+    assert c.current_player.name == 'test1'
+
+
+def test_snapshot_restore():
+    c = Coup([Player('test0', cards=[Card('duke')]), Player('test1', coins=7), Player('test2')])
+    c.trigger('captain', target='test2')
+    snapshot = c.snapshot()
+    before = repr(c), [card.name for card in c.deck.cards], c.captain_target, c.current_player
+    c.trigger('challenge_captain', challenger='test1')
+    c.trigger('coup', target='test0')
+    c.trigger('income')
+    c.restore(snapshot)
+    assert (repr(c), [card.name for card in c.deck.cards], c.captain_target, c.current_player) == before
+    assert [p.influence() for p in c.players] == [2, 2, 2]
+    assert c.state == States.waiting_challenge_captain
+    assert len(c.history) == 1
+
+
+def test_clone():
+    c = Coup([Player('test0'), Player('test1'), Player('test2')])
+    c.trigger('captain', target='test1')
+    clone = c.clone()
+    assert repr(clone) == repr(c)
+    assert clone.captain_target is clone.get_player('test1')
+    clone.trigger('decline_challenge_captain')
+    assert c.state == States.waiting_challenge_captain
+    assert c.get_player('test1').coins == 2
+    assert clone.get_player('test1').coins == 0
+    c.trigger('decline_challenge_captain')
+    assert repr(clone) == repr(c)
+    assert clone.history == c.history
+    assert c.snapshot() == clone.snapshot()
+
+
+def probe_actions(c: Coup) -> set:
+    # Brute force: try every trigger with every possible parameter on a clone of the game
+    actions = set()
+    for trigger in c.m.events:
+        if trigger in INTERNAL_TRIGGERS:
+            continue
+        for name in [None] + [player.name for player in c.players]:
+            if (name is None) != (trigger not in ACTION_KWARGS):
+                continue
+            probe = c.clone(random.Random(0))
+            try:
+                if probe.trigger(trigger, **action_kwargs((trigger, name))):
+                    actions.add((trigger, name))
+            except Exception:
+                pass
+    return actions
+
+
+def test_legal_actions_match_probing():
+    rng = random.Random(4)
+    states = set()
+    for game in range(30):
+        c = Coup([Player(f'test{i}') for i in range(rng.randint(2, 4))], seed=game)
+        while c.state != States.game_over:
+            legal = c.legal_actions()
+            assert set(legal) == probe_actions(c)
+            assert len(set(legal)) == len(legal)
+            assert c.legal_actions() is legal
+            states.add(c.state)
+            action = rng.choice(legal)
+            c.trigger(action[0], **action_kwargs(action))
+        assert c.legal_actions() == ()
+    assert len(states) == len(States) - 1
+
+
+def test_legal_actions_force_coup():
+    c = Coup([Player('test0', coins=10), Player('test1'), Player('test2')])
+    assert c.legal_actions() == (('coup', 'test1'), ('coup', 'test2'))
+    c = Coup([Player('test0', coins=3), Player('test1')])
+    assert ('assassin', 'test1') in c.legal_actions()
+    assert ('coup', 'test1') not in c.legal_actions()
+    assert ('captain', 'test0') not in c.legal_actions()
+
+
+def test_attribute_triggers():
+    c = Coup([Player('test0', coins=9), Player('test1')], seed=3)
+    assert ('income', None) in c.legal_actions()
+    c.income()
+    c.income()
+    # The calls go through trigger, so the legal actions are recomputed and the history is kept
+    assert c.current_player.coins == 10
+    assert c.legal_actions() == (('coup', 'test1'),)
+    c.coup(target='test1')
+    c.duke()
+    c.challenge_duke(challenger='test0')
+    assert [trigger for trigger, _, _ in c.history] == ['income', 'income', 'coup', 'duke', 'challenge_duke']
+    replayed = Coup.replay([Player('test0', coins=9), Player('test1')], c.seed, c.history)
+    assert repr(replayed) == repr(c)
+    with pytest.raises(AttributeError):
+        c.not_a_trigger()
+
+
+def test_no_self_challenge():
+    c = Coup([Player('a'), Player('b'), Player('c')], seed=1)
+    c.trigger('duke')
+    assert ('challenge_duke', 'a') not in c.legal_actions()
+    assert ('challenge_duke', 'b') in c.legal_actions()
+    with pytest.raises(Exception):
+        c.trigger('challenge_duke', challenger='a')
+    assert c.state == States.waiting_challenge_duke and c.alive == 0b111
+    c.trigger('decline_challenge_duke')
+    c.trigger('captain', target='c')
+    c.trigger('block_captain')
+    assert ('challenge_block_captain', 'c') not in c.legal_actions()
+    with pytest.raises(Exception):
+        c.trigger('challenge_block_captain', challenger='c')
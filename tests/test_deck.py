@@ -0,0 +1,80 @@
+import random
+from collections import Counter
+
+from coup import *
+from coup.deck import card_codes, card_types
+
+TRIALS = 20000
+# Chi-square critical values at p = 0.001, by degrees of freedom
+CRITICAL = {9: 27.88, 12: 32.91, 24: 51.18}
+
+
+class FullShuffleDeck(Deck):
+    # The original behaviour, reshuffle the whole deck on every return
+    def return_to_deck(self, card):
+        card.face_up = False
+        self.codes.append(card.code)
+        self.shuffle()
+
+
+def chi_square(observed: Counter, expected: dict) -> float:
+    return sum((observed[key] - count) ** 2 / count for key, count in expected.items())
+
+
+def two_sample_chi_square(a: Counter, b: Counter) -> tuple[float, int]:
+    keys = set(a) | set(b)
+    n_a, n_b = sum(a.values()), sum(b.values())
+    stat = 0.0
+    for key in keys:
+        total = a[key] + b[key]
+        stat += (a[key] - total * n_a / (n_a + n_b)) ** 2 / (total * n_a / (n_a + n_b))
+        stat += (b[key] - total * n_b / (n_a + n_b)) ** 2 / (total * n_b / (n_a + n_b))
+    return stat, len(keys) - 1
+
+
+def test_return_position_uniform():
+    rng = random.Random(1)
+    positions = Counter()
+    for _ in range(TRIALS):
+        deck = Deck(pre_cards=[Card('duke')] * 3, rng=rng)
+        deck.return_to_deck(Card('duke'))
+        positions[deck.codes.index(card_codes['duke'])] += 1
+    assert chi_square(positions, {i: TRIALS / 13 for i in range(13)}) < CRITICAL[12]
+
+
+def test_draw_after_return():
+    # Two draws after returning a card should follow the exact probabilities of a fully shuffled deck
+    rng = random.Random(2)
+    pre_cards = [Card('duke'), Card('duke'), Card('assassin')]
+    draws = Counter()
+    for _ in range(TRIALS):
+        deck = Deck(pre_cards=pre_cards, rng=rng)
+        deck.return_to_deck(Card('duke'))
+        draws[deck.draw().name, deck.draw().name] += 1
+
+    counts = {'duke': 2, 'assassin': 2, 'contessa': 3, 'captain': 3, 'ambassador': 3}
+    n = sum(counts.values())
+    expected = {(a, b): TRIALS * counts[a] / n * (counts[b] - (a == b)) / (n - 1)
+                for a in card_types for b in card_types}
+    assert chi_square(draws, expected) < CRITICAL[24]
+
+
+def test_matches_full_shuffle():
+    # Challenge heavy sequences of exchanges compared against reshuffling the whole deck each time
+    def run(deck_cls, seed):
+        rng = random.Random(seed)
+        hands = Counter()
+        for _ in range(TRIALS // 4):
+            deck = deck_cls(rng=rng)
+            hand = [deck.draw(), deck.draw()]
+            for _ in range(8):
+                card = hand.pop(0)
+                deck.return_to_deck(card)
+                hand.append(deck.draw())
+            hands.update(card.name for card in hand)
+            hands.update('next ' + deck.draw().name for _ in range(2))
+        return hands
+
+    stat, df = two_sample_chi_square(run(Deck, 3), run(FullShuffleDeck, 4))
+    assert df == 9
+    assert stat < CRITICAL[df]
@@ -0,0 +1,109 @@
+import random
+
+import pytest
+
+from coup import *
+from coup.endgame import (DRAW, HAND_INDEX, HANDS, LOSS, MAGIC, MAX_PLIES, SIZE, WIN, COINS, Tablebase, build,
+                          decode, index, save, successors)
+from coup.sim import random_turns, seeded_game
+
+
+@pytest.fixture(scope='module')
+def table() -> bytearray:
+    return build(workers=0)
+
+
+@pytest.fixture(scope='module')
+def tablebase(table, tmp_path_factory) -> Tablebase:
+    path = tmp_path_factory.mktemp('endgame') / 'endgame.bin'
+    save(table, str(path))
+    with Tablebase(str(path)) as tb:
+        yield tb
+
+
+def edge_value(table, edge) -> tuple[int, int]:
+    # The outcome of an edge for the player choosing it
+    if edge[0] == 'end':
+        return edge[1], 0
+    if edge[0] == 'table':
+        outcome, plies = decode(table[edge[1]])
+    else:
+        node = edge[1]
+        if node[0] == 'turn':
+            outcome, plies = decode(table[index(*node[1:])])
+        else:
+            outcome, plies = best(table, successors(node))
+    return (-outcome if edge[-1] is True else outcome), plies
+
+
+def best(table, edges) -> tuple[int, int]:
+    values = [edge_value(table, edge) for edge in edges]
+    wins = [plies for outcome, plies in values if outcome == WIN]
+    if wins:
+        return WIN, min(wins) + 1
+    if all(outcome == LOSS for outcome, _ in values):
+        return LOSS, max(plies for _, plies in values) + 1
+    return DRAW, 0
+
+
+def test_consistent(table):
+    # Every position's value is the best of its moves
+    assert max(decode(value)[1] for value in table) < MAX_PLIES
+    for h in range(len(HANDS)):
+        for g in range(len(HANDS)):
+            for m in range(COINS):
+                for o in range(COINS):
+                    node = ('turn', m, o, h, g)
+                    assert decode(table[index(m, o, h, g)]) == best(table, successors(node)), node
+
+
+def test_parallel_build(table):
+    assert build(workers=2) == table
+
+
+def test_probe(tablebase):
+    duke, captain = card_codes['duke'], card_codes['captain']
+    # Coup the last card
+    assert tablebase.probe(7, 0, (duke,), (captain,)) == (WIN, 1)
+    assert tablebase.probe(13, 0, (duke,), (captain,)) is None
+    assert tablebase.probe(0, 0, (duke, duke, duke), (captain,)) is None
+
+
+def test_game(tablebase):
+    c = Coup([Player('test0', coins=7, cards=[Card('duke'), Card('captain')]),
+              Player('test1', cards=[Card('contessa', face_up=True), Card('duke')]),
+              Player('test2')])
+    assert tablebase.solve(c) is None
+    c.lose_influence(c.players[2])
+    c.lose_influence(c.players[2])
+    assert tablebase.solve(c) == (WIN, 1)
+    assert tablebase.expected_score(c) == 1.0
+    c.trigger('income')
+    assert tablebase.solve(c)[0] == LOSS
+    assert 0 <= tablebase.expected_score(c) < 1
+
+
+def test_lookup_in_games(tablebase):
+    # Agents can look duels up while playing, the game itself is still played out
+    rng = random.Random(5)
+    looked_up = 0
+    for _ in range(10):
+        game = seeded_game(3, rng)
+        for _ in random_turns(game, rng):
+            result = tablebase.solve(game)
+            if tablebase.duel(game) is None:
+                assert result is None
+            elif result is not None:
+                looked_up += 1
+                score = tablebase.expected_score(game)
+                assert score is None or 0 <= score <= 1
+        assert game.state == States.game_over
+    assert looked_up
+
+
+def test_file(table, tmp_path):
+    path = tmp_path / 'bad.bin'
+    path.write_bytes(MAGIC + bytes(SIZE - 1))
+    with pytest.raises(Exception):
+        Tablebase(str(path))
+    assert len(HAND_INDEX) == 30
@@ -0,0 +1,75 @@
+import random
+import tracemalloc
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from coup.env import CoupEnv
+from coup.states import States
+from coup.vec import VecCoup
+
+
+def random_action(env: CoupEnv, rng: random.Random) -> int:
+    return rng.choice(np.flatnonzero(env.action_mask).tolist())
+
+
+def test_episodes():
+    rng = random.Random(0)
+    env = CoupEnv(3, seed=0)
+    for _ in range(20):
+        observations, info = env.reset()
+        buffer = env.observations
+        terminated = truncated = False
+        while not terminated and not truncated:
+            assert info['agent'] is not None and info['action_mask'].any()
+            observations, rewards, terminated, truncated, info = env.step(random_action(env, rng))
+            assert observations is buffer
+        assert info['agent'] is None
+        if terminated:
+            assert env.game.state == States.game_over
+            assert sorted(rewards) == [-1, -1, 1]
+
+
+def test_observations_match_vec():
+    rng = random.Random(1)
+    env = CoupEnv(4, seed=1)
+    env.reset()
+    public = env.observations.shape[1] - env.n_players
+    for _ in range(200):
+        if env.agent_selection is None:
+            env.reset()
+        v = VecCoup.from_games([env.game])
+        for seat in range(env.n_players):
+            assert np.array_equal(env.observations[seat, :public], v.observe(seats=np.array([seat]))[0])
+            assert env.observations[seat, public + seat] == 1
+        env.step(random_action(env, rng))
+
+
+def test_masks():
+    env = CoupEnv(2, seed=2)
+    env.reset()
+    allowed = {env.actions[i] for i in np.flatnonzero(env.action_mask)}
+    assert allowed == {('income', None), ('foreign_aid', None), ('duke', None), ('captain', 1), ('ambassador', None)}
+    env.step(env.actions.index(('duke', None)))
+    # The other player may challenge or pass
+    assert env.agent_selection == 1
+    allowed = {env.actions[i] for i in np.flatnonzero(env.action_mask)}
+    assert allowed == {('challenge_duke', 1), ('decline_challenge_duke', None)}
+    env.step(env.actions.index(('decline_challenge_duke', None)))
+    assert env.game.get_player('p0').coins == 5
+    assert env.agent_selection == 1
+
+
+def test_encode_does_not_allocate():
+    env = CoupEnv(6, seed=3)
+    env.reset()
+    env.encode()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for _ in range(1000):
+        env.encode()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    growth = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    assert growth < 1024
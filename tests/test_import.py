@@ -0,0 +1,27 @@
+import subprocess
+import sys
+
+# Heavy or optional dependencies a plain `import coup` must not load
+LAZY = ('graphviz', 'pygraphviz', 'transitions.extensions', 'numpy', 'asyncio', 'coup.diagram', 'coup.vec',
+        'coup.sim')
+
+
+def imported_modules(statement: str) -> set[str]:
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement], capture_output=True, text=True,
+                            check=True)
+    return {line.split('|')[-1].strip() for line in result.stderr.splitlines() if line.startswith('import time:')}
+
+
+def test_import_is_light():
+    modules = imported_modules('import coup; coup.Coup([coup.Player("a"), coup.Player("b")]).trigger("income")')
+    assert 'coup.game' in modules
+    for name in LAZY:
+        assert not any(module == name or module.startswith(name + '.') for module in modules), name
+
+
+def test_submodules_load_on_use():
+    statement = 'import coup, sys; coup.sim.RandomAgent; print(" ".join(sys.modules))'
+    modules = subprocess.run([sys.executable, '-c', statement], capture_output=True, text=True,
+                             check=True).stdout.split()
+    assert 'coup.sim' in modules
+    assert 'coup.diagram' not in modules
@@ -0,0 +1,61 @@
+import gc
+import json
+import weakref
+
+from coup import *
+from coup.instrument import Profile, instrument
+from coup.sim import RandomAgent, run_games
+
+
+def test_counts():
+    profile = Profile()
+    agents = [RandomAgent(), RandomAgent(), RandomAgent()]
+    stats = run_games(30, agents, seed=4, profile=profile)
+    assert {name: calls for name, (calls, _) in profile.triggers.items()} == stats.action_counts
+    assert profile.callbacks['next_turn'][0] > 0
+    assert all(seconds >= 0 for _, seconds in profile.callbacks.values())
+    # Timing doesn't change the games played
+    plain = run_games(30, agents, seed=4)
+    assert plain.wins == stats.wins and plain.action_counts == stats.action_counts
+
+
+def test_instrumented_game():
+    profile = Profile()
+    cls = instrument(profile)
+    assert instrument(profile) is cls
+    c = cls([Player('test0', coins=2), Player('test1', coins=2)], seed=0)
+    c.trigger('captain', target='test1')
+    c.trigger('decline_challenge_captain')
+    assert c.get_player('test0').coins == 4
+    assert profile.triggers['captain'][0] == 1
+    assert profile.callbacks['do_captain'][0] == 1
+    assert profile.callbacks['next_turn'][0] == 1
+    assert isinstance(c.clone(), cls)
+    # Games built from Coup are not recorded
+    Coup([Player('test0'), Player('test1')]).trigger('income')
+    assert 'income' not in profile.triggers
+
+
+def test_profiles_are_released():
+    profile = Profile()
+    instrument(profile)([Player('test0'), Player('test1')], seed=0).trigger('income')
+    ref = weakref.ref(profile)
+    del profile
+    gc.collect()
+    assert ref() is None
+
+
+def test_export():
+    profile = Profile()
+    c = instrument(profile)([Player('test0'), Player('test1')], seed=0)
+    c.trigger('income')
+    text = profile.to_prometheus()
+    assert '# TYPE coup_trigger_calls_total counter' in text
+    assert 'coup_trigger_calls_total{trigger="income"} 1' in text
+    assert 'coup_callback_calls_total{callback="do_income"} 1' in text
+    data = json.loads(profile.to_json())
+    assert data['triggers']['income']['calls'] == 1
+    other = Profile()
+    other.merge(profile)
+    other.merge(profile)
+    assert other.triggers['income'][0] == 2
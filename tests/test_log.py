@@ -0,0 +1,37 @@
+from coup import *
+from coup.deck import card_codes
+from coup.log import *
+from coup.sim import RandomAgent, AlwaysChallengeAgent, run_games
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'games.bin')
+    c = Coup([Player('test0', cards=[Card('duke')], coins=7), Player('test1')])
+    c.trigger('duke')
+    c.trigger('challenge_duke', challenger='test1')
+    c.trigger('captain', target='test0')
+    c.trigger('decline_challenge_captain')
+    with LogWriter(path) as writer:
+        writer.write_game(c)
+    with LogReader(path) as reader:
+        record, = list(reader)
+        assert record.seed == c.seed
+        assert record.setup == [('test0', 7, [(card_codes['duke'], False)]), ('test1', 2, [])]
+        assert record.history == c.history
+        assert repr(record.replay()) == repr(c)
+
+
+def test_simulation_log(tmp_path):
+    path = str(tmp_path / 'games.bin')
+    with LogWriter(path) as writer:
+        run_games(20, [RandomAgent(), AlwaysChallengeAgent(), RandomAgent()], seed=1, log=writer)
+    # Appending starts a new string table
+    with LogWriter(path) as writer:
+        run_games(5, [RandomAgent(), RandomAgent()], seed=2, log=writer)
+    with LogReader(path) as reader:
+        assert reader.count() == 25
+        for record in reader:
+            game = record.replay()
+            assert game.state == States.game_over
+            assert game.history == record.history
+        assert len(reader.game(22).setup) == 2
@@ -0,0 +1,38 @@
+import random
+from collections import Counter
+
+from coup import *
+from coup.agents.mcts import MCTSAgent, determinize, info_key
+from coup.sim import RandomAgent, run_games, turn_options
+from coup.zobrist import PositionCache
+
+
+def test_determinize():
+    c = Coup([Player('test0'), Player('test1', cards=[Card('duke')]), Player('test2')], seed=1)
+    c.get_player('test1').lose_influence()
+    player = c.get_player('test0')
+    d = determinize(c, player, random.Random(0))
+    assert [card.name for card in d.get_player('test0').cards] == [card.name for card in player.cards]
+    assert d.get_player('test1').cards[0].face_up and d.get_player('test1').cards[0].name == 'duke'
+    codes = lambda g: Counter(list(g.deck.codes) + [card.code for p in g.players for card in p.cards])
+    assert codes(d) == codes(c)
+    assert info_key(d, d.get_player('test0')) == info_key(c, player)
+
+
+def test_mcts_agent():
+    agent = MCTSAgent(iterations=30, table_size=50)
+    c = Coup([Player('test0'), Player('test1')], seed=2)
+    options = turn_options(c)
+    assert agent.act(c, c.current_player, options, random.Random(0)) in options
+    assert agent.total_iterations == 30
+    assert len(agent.table) <= 50
+    stats = run_games(2, [agent, RandomAgent()], seed=3)
+    assert stats.games == 2
+
+
+def test_shared_table():
+    table = PositionCache(maxsize=1000)
+    agents = [MCTSAgent(iterations=20, table=table), MCTSAgent(iterations=20, table=table)]
+    assert run_games(2, agents, seed=4).games == 2
+    assert agents[0].table is agents[1].table
+    assert table.hits > 0 and len(table) <= 1000
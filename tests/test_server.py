@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+from coup.server import CoupServer, load_test
+
+
+async def connect(port: int, table: str, name: str):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(json.dumps({'op': 'join', 'table': table, 'name': name, 'players': 2}).encode() + b'\n')
+    return reader, writer
+
+
+async def send(writer, message):
+    writer.write(json.dumps(message).encode() + b'\n')
+    await writer.drain()
+
+
+async def receive(reader):
+    return json.loads(await asyncio.wait_for(reader.readline(), 5))
+
+
+def test_table():
+    async def run():
+        server = CoupServer(seed=0)
+        port = (await server.start()).sockets[0].getsockname()[1]
+        alice_reader, alice = await connect(port, 't', 'alice')
+        bob_reader, bob = await connect(port, 't', 'bob')
+        start = await receive(alice_reader)
+        assert start['diff']['current'] == 'alice'
+        assert len(start['hand']) == 2
+        assert ['income', None] in start['actions']
+        assert (await receive(bob_reader))['actions'] == []
+
+        # Only the current player may act
+        await send(bob, {'op': 'trigger', 'id': 1, 'trigger': 'income'})
+        assert (await receive(bob_reader))['op'] == 'error'
+        await send(alice, {'op': 'trigger', 'id': 2, 'trigger': 'coup', 'kwargs': {'target': 'bob'}})
+        assert (await receive(alice_reader)) == {'op': 'error', 'id': 2, 'error': 'alice cannot coup now'}
+
+        await send(alice, {'op': 'trigger', 'id': 3, 'trigger': 'income'})
+        update = await receive(bob_reader)
+        assert update['trigger'] == 'income'
+        assert update['diff'] == {'current': 'bob', 'players': {'alice': {'coins': 3, 'influence': 2, 'revealed': []}}}
+        assert (await receive(alice_reader))['op'] == 'update'
+        assert (await receive(alice_reader)) == {'op': 'ok', 'id': 3}
+
+        # Bob claims the duke, alice passing takes the decline
+        await send(bob, {'op': 'trigger', 'id': 4, 'trigger': 'duke'})
+        update = await receive(alice_reader)
+        assert update['actions'] == [['challenge_duke', 'alice'], ['decline_challenge_duke', None]]
+        await send(alice, {'op': 'trigger', 'id': 5, 'trigger': 'decline_challenge_duke'})
+        update = await receive(alice_reader)
+        assert update['diff']['players']['bob']['coins'] == 5
+        alice.close()
+        bob.close()
+        await server.close()
+
+    asyncio.run(run())
+
+
+def test_disconnect():
+    async def run():
+        server = CoupServer(seed=0)
+        port = (await server.start()).sockets[0].getsockname()[1]
+        alice_reader, alice = await connect(port, 't', 'alice')
+        bob_reader, bob = await connect(port, 't', 'bob')
+        await receive(alice_reader)
+        await receive(bob_reader)
+        await send(alice, {'op': 'trigger', 'id': 1, 'trigger': 'income'})
+        await receive(bob_reader)
+
+        # Bob leaves on his turn, alice wins instead of waiting on him
+        bob.close()
+        assert (await receive(alice_reader))['op'] == 'update'
+        assert (await receive(alice_reader)) == {'op': 'ok', 'id': 1}
+        assert (await receive(alice_reader)) == {'op': 'left', 'name': 'bob'}
+        update = await receive(alice_reader)
+        assert update['winner'] == 'alice' and update['actions'] == []
+        assert update['diff']['players']['bob']['influence'] == 0
+        assert not server.tables
+        alice.close()
+        await server.close()
+
+    asyncio.run(run())
+
+
+def test_load():
+    async def run():
+        server = CoupServer(seed=1)
+        port = (await server.start()).sockets[0].getsockname()[1]
+        result = await load_test('127.0.0.1', port, 40, players=2)
+        await server.close()
+        return result, server
+
+    result, server = asyncio.run(run())
+    assert result['triggers'] > 40
+    assert 0 < result['p50_ms'] <= result['p99_ms']
+    assert not server.tables
@@ -0,0 +1,50 @@
+import random
+
+from coup import *
+from coup.sim import *
+
+
+def test_run_games():
+    stats = run_games(50, [RandomAgent(), GreedyCoinsAgent(), AlwaysChallengeAgent()], seed=0)
+    assert stats.games == 50
+    assert sum(stats.wins) + stats.unfinished == 50
+    assert sum(stats.action_counts.values()) == stats.total_actions
+    assert stats.mean_length > 0
+    assert stats.games_per_sec > 0
+
+
+def test_turn_options():
+    c = Coup([Player('test0', coins=10), Player('test1'), Player('test2')])
+    assert turn_options(c) == [('coup', 'test1'), ('coup', 'test2')]
+    c = Coup([Player('test0', coins=3), Player('test1')])
+    assert ('assassin', 'test1') in turn_options(c)
+    assert ('coup', 'test1') not in turn_options(c)
+
+
+def test_always_challenge():
+    c = Coup([Player('test0', cards=[Card('duke'), Card('duke')]), Player('test1')])
+    agents = [GreedyCoinsAgent(), AlwaysChallengeAgent()]
+    seats = {'test0': 0, 'test1': 1}
+    action = next_action(c, agents, seats, random.Random(0))
+    assert action[0] == 'duke'
+    c.trigger(*action)
+    action = next_action(c, agents, seats, random.Random(0))
+    assert action == ('challenge_duke', 'test1')
+    c.trigger(action[0], **action_kwargs(action))
+    assert c.get_player('test1').influence() == 1
+    assert c.get_player('test0').coins == 5
+
+
+def test_game_over():
+    c = Coup([Player('test0', coins=7), Player('test1', cards=[Card('duke')])])
+    c.get_player('test1').lose_influence()
+    c.trigger('coup', target='test1')
+    assert c.state == States.game_over
+
+
+def test_reproducible():
+    agents = [RandomAgent(), RandomAgent(), AlwaysChallengeAgent()]
+    a = run_games(30, agents, seed=2)
+    b = run_games(30, agents, seed=2)
+    assert a.wins == b.wins
+    assert a.action_counts == b.action_counts
@@ -0,0 +1,22 @@
+import itertools
+
+from coup.tournament import *
+
+
+def test_make_shards():
+    shards = list(make_shards([('random', 'greedy'), ('random', 'greedy', 'challenge')], 100, seed=1, shard_size=20))
+    assert [shard[0] for shard in shards] == list(range(len(shards)))
+    assert sum(shard[3] for shard in shards if shard[1] == 0) == 100
+    assert sum(shard[3] for shard in shards if shard[1] == 1) == 100
+    assert {shard[2] for shard in shards if shard[1] == 1} == set(itertools.permutations(range(3)))
+    assert shards == list(make_shards([('random', 'greedy'), ('random', 'greedy', 'challenge')], 100, seed=1,
+                                      shard_size=20))
+
+
+def test_reproducible():
+    lineups = [('random', 'greedy'), ('challenge', 'random', 'random')]
+    local = run_tournament(lineups, 60, seed=3, workers=0, shard_size=7)
+    assert local.games == 120
+    assert sum(local.stats[0].wins) + local.stats[0].unfinished == 60
+    assert local == run_tournament(lineups, 60, seed=3, workers=1, shard_size=7)
+    assert local == run_tournament(lineups, 60, seed=3, workers=2, shard_size=7)
@@ -0,0 +1,88 @@
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from coup import *
+from coup.game import action_kwargs
+from coup.vec import VecCoup, action_space
+
+
+def peek_random(game: Coup) -> float:
+    # The next number the game's deck would draw when returning a card
+    state = game.rng.getstate()
+    u = game.rng.random()
+    game.rng.setstate(state)
+    return u
+
+
+@pytest.mark.parametrize('n_players', [2, 3, 4, 6])
+def test_conformance(n_players):
+    rng = random.Random(n_players)
+    games = [Coup([Player(f'p{seat}') for seat in range(n_players)], seed=rng.getrandbits(64)) for _ in range(32)]
+    v = VecCoup.from_games(games)
+    index = {(trigger, seat): i for i, (trigger, seat) in enumerate(v.actions)}
+    for _ in range(300):
+        mask = v.legal_mask()
+        actions = np.zeros(len(games), dtype=np.intp)
+        u = np.zeros(len(games))
+        for i, game in enumerate(games):
+            if game.state == States.game_over:
+                continue
+            legal = [index[trigger, game.seat_of(game.get_player(name)) if name else None]
+                     for trigger, name in game.legal_actions()]
+            assert sorted(legal) == list(np.nonzero(mask[i])[0])
+            action = rng.choice(game.legal_actions())
+            actions[i] = legal[game.legal_actions().index(action)]
+            u[i] = peek_random(game)
+            assert game.trigger(action[0], **action_kwargs(action))
+        v.step(actions, u)
+        expected = VecCoup.from_games(games).state()
+        for name, values in v.state().items():
+            assert np.array_equal(values, expected[name]), name
+    assert v.done.any()
+    for i, game in enumerate(games):
+        if game.state == States.game_over:
+            assert v.winner()[i] == game.alive.bit_length() - 1
+
+
+def test_illegal_action():
+    v = VecCoup(4, 2, seed=0)
+    with pytest.raises(Exception):
+        v.step(np.full(4, v.actions.index(('coup', 1))))
+
+
+def test_reset_deals():
+    v = VecCoup(100, 3, seed=0)
+    assert np.array_equal(VecCoup(100, 3, seed=0).state()['hand'], v.hand)
+    # Every card is either in a hand or the deck
+    counts = np.zeros((100, 5), dtype=int)
+    for code in range(5):
+        counts[:, code] = (v.hand == code).sum(axis=(1, 2)) + (v.deck == code).sum(axis=1)
+    assert (counts == 3).all()
+    assert (v.deck_len == 9).all()
+
+
+def test_random_games_finish():
+    v = VecCoup(256, 4, seed=1)
+    rng = np.random.default_rng(1)
+    for _ in range(2000):
+        if v.done.all():
+            break
+        mask = v.legal_mask()
+        # Pick a uniformly random legal action per game, finished games have no legal action and pick 0
+        actions = np.argmax(rng.random(mask.shape) * mask, axis=1)
+        v.step(actions)
+    assert v.done.all()
+    assert (v.winner() >= 0).all()
+    obs = v.observe()
+    assert obs.shape == (256, v.observation_size)
+    assert obs.dtype == np.float32
+
+
+def test_action_space():
+    actions = action_space(3)
+    assert ('income', None) in actions
+    assert [seat for trigger, seat in actions if trigger == 'coup'] == [0, 1, 2]
+    assert 'game_over' not in {trigger for trigger, _ in actions}
@@ -0,0 +1,69 @@
+import random
+
+from coup import *
+from coup.sim import random_turns, seeded_game
+from coup.zobrist import PositionCache, ZobristHash, info_hash, position_hash
+
+
+def test_incremental_matches_scratch():
+    rng = random.Random(0)
+    for _ in range(20):
+        game = seeded_game(4, rng)
+        position = ZobristHash(game)
+        for _ in random_turns(game, rng):
+            assert position.value == position_hash(game)
+            for seat in range(4):
+                assert position.info_key(seat) == info_hash(game, seat)
+
+
+def test_canonical():
+    c = Coup([Player('test0'), Player('test1'), Player('test2')], seed=1)
+    renamed = Coup([Player('a'), Player('b'), Player('c')], seed=1)
+    assert position_hash(c) == position_hash(renamed)
+    start = position_hash(c)
+    c.trigger('income')
+    assert position_hash(c) != start
+    assert position_hash(c) != position_hash(renamed)
+    renamed.trigger('income')
+    assert position_hash(c) == position_hash(renamed)
+    # The deck order is hidden from every player
+    c.deck.codes.reverse()
+    assert position_hash(c) == position_hash(renamed)
+    # Seats, not the hands, set what a player knows
+    assert info_hash(c, 0) != info_hash(c, 1)
+
+
+def test_cards_and_targets():
+    c = Coup([Player('test0', cards=[Card('duke'), Card('captain')]),
+              Player('test1', cards=[Card('contessa'), Card('assassin')])], seed=0)
+    before = position_hash(c), info_hash(c, 0), info_hash(c, 1)
+    c.players[1].cards.reverse()
+    assert position_hash(c) != before[0]
+    # Only test1 can tell its cards were swapped
+    assert info_hash(c, 0) == before[1]
+    assert info_hash(c, 1) != before[2]
+    c.players[1].cards.reverse()
+    position = ZobristHash(c)
+    c.trigger('captain', target='test1')
+    assert position.value == position_hash(c) != before[0]
+    c.trigger('block_captain')
+    c.trigger('challenge_block_captain', challenger='test0')
+    assert position.value == position_hash(c)
+    position.detach()
+    assert c.observers == []
+
+
+def test_position_cache():
+    cache = PositionCache(maxsize=2)
+    cache.put(1, 'a')
+    cache.put(2, 'b')
+    assert cache.get(1) == 'a'
+    cache.put(3, 'c')
+    assert 2 not in cache and 1 in cache and len(cache) == 2
+    assert cache.get(2) is None
+    assert cache.memo(3, lambda: 'unused') == 'c'
+    assert cache.memo(4, lambda: None) is None and 4 in cache
+    assert (cache.hits, cache.misses, cache.evictions) == (2, 2, 2)
+    assert cache.hit_rate == 0.5
+    cache.clear()
+    assert len(cache) == 0 and cache.hit_rate == 0.0